@@ -1,7 +1,7 @@
 import django
 from django.db.models.fields import FieldDoesNotExist
 from django.utils.translation import get_language
-from hvad.utils import get_translation
+from hvad.utils import get_translation, set_cached_translation
 if django.VERSION >= (1, 7):
     from django.apps import registry
 
@@ -25,7 +25,7 @@ class BaseDescriptor(object):
                                                'the instance has a translation loaded, or a '
                                                'valid translation in current language (%s) '
                                                'loadable from the database' % get_language())
-            setattr(instance, self.opts.translations_cache, cached)
+            set_cached_translation(instance, cached)
         return cached
 
 
@@ -1,23 +1,28 @@
-from collections import defaultdict
+from collections import defaultdict, namedtuple
 import django
 from django.conf import settings
-from django.db import models, transaction, IntegrityError
-from django.db.models.query import QuerySet, ValuesQuerySet, DateQuerySet
+from django.db import connections, models, transaction, IntegrityError
+from django.db.models.query import (QuerySet, ValuesQuerySet, ValuesListQuerySet,
+                                    DateQuerySet)
 if django.VERSION >= (1, 6):
     from django.db.models.query import DateTimeQuerySet
 try:
     from django.db.models.query import CHUNK_SIZE
 except ImportError:
     CHUNK_SIZE = 100
-from django.db.models import Q
+from django.db.models import F, Q
 from django.utils.translation import get_language
 from hvad.fieldtranslator import translate
-from hvad.query import q_children, where_node_children
-from hvad.utils import combine, minimumDjangoVersion
+from hvad.query import q_keys, q_rewrite, where_node_aliases, where_node_children
+from hvad.utils import (combine, get_proxy_class, minimumDjangoVersion,
+                        prefetch_translations, TranslationsBatch)
 from hvad.compat.settings import settings_updater
-from copy import deepcopy
+from functools import partial, wraps
+from itertools import chain, islice
 import logging
+import re
 import sys
+import threading
 import warnings
 
 #===============================================================================
@@ -25,11 +30,43 @@ import warnings
 # Logging-related globals
 _logger = logging.getLogger(__name__)
 
+atomic = (partial(transaction.atomic, savepoint=False) if django.VERSION >= (1, 6) else
+          transaction.commit_on_success)
+
+def max_query_params(connection):
+    """ Maximum number of parameters in a query, or None if the backend has no
+        limit. Django does not expose it before 1.8, but ops.bulk_batch_size
+        applies it, so it is worked out from batches of 3-parameter objects.
+    """
+    if not hasattr(connection.ops, 'bulk_batch_size'):     # Django 1.4
+        return 999 if connection.vendor == 'sqlite' else None
+    probe = [None] * 10000
+    size = connection.ops.bulk_batch_size([None] * 3, probe)
+    return size * 3 if size < len(probe) else None
+
+def bulk_batch_size(connection, params_per_obj, objs, reserved=0):
+    """ Number of objs that can be handled by one query, using params_per_obj
+        parameters for each obj, plus reserved parameters.
+    """
+    max_params = max_query_params(connection)
+    if max_params is None:
+        return max(len(objs), 1)
+    return max((max_params - reserved) // params_per_obj, 1)
+
+FALLBACK_STRATEGIES = ('selfjoin', 'window')
+
+def check_fallback_strategy(strategy):
+    if strategy is not None and strategy not in FALLBACK_STRATEGIES:
+        raise ValueError('Unknown fallback strategy %r, valid strategies are %s'
+                         % (strategy, ', '.join(FALLBACK_STRATEGIES)))
+
 # Global settings, wrapped so they react to SettingsOverride
 @settings_updater
 def update_settings(*args, **kwargs):
-    global FALLBACK_LANGUAGES, LEGACY_FALLBACKS
+    global FALLBACK_LANGUAGES, FALLBACK_STRATEGY, LEGACY_FALLBACKS
     FALLBACK_LANGUAGES = tuple(code for code, name in settings.LANGUAGES)
+    FALLBACK_STRATEGY = getattr(settings, 'HVAD_FALLBACK_STRATEGY', 'selfjoin')
+    check_fallback_strategy(FALLBACK_STRATEGY)
     LEGACY_FALLBACKS = bool(getattr(settings, 'HVAD_LEGACY_FALLBACKS', django.VERSION < (1, 6)))
 
 #===============================================================================
@@ -38,10 +75,10 @@ class FieldTranslator(object):
     """
     Translates *shared* field names from '<shared_field>' to
     'master__<shared_field>' and caches those names.
+    One instance is shared by all querysets on a model.
     """
-    def __init__(self, manager):
-        self._manager = manager
-        self._shared_fields = tuple(manager.shared_model._meta.get_all_field_names()) + ('pk',)
+    def __init__(self, model):
+        self._shared_fields = tuple(model._meta.get_all_field_names()) + ('pk',)
         self._cache = dict()
         super(FieldTranslator, self).__init__()
 
@@ -77,13 +114,58 @@ class FieldTranslator(object):
         else:
             return '%s%s' % (prefix, key)
 
+
+LookupCacheInfo = namedtuple('LookupCacheInfo', 'hits misses maxsize currsize')
+
+class LookupCache(object):
+    """
+    Caches data that only depends on the shape of a query, such as translated
+    lookup keys of filter(), exclude() and the like. Entries are keyed by model
+    and lookup keys only, so every query of the same shape shares them,
+    whatever the values. The cache is emptied once it holds maxsize entries.
+    """
+    def __init__(self, maxsize=1000):
+        self.maxsize = maxsize
+        self._cache = dict()
+        self.hits = self.misses = 0
+        super(LookupCache, self).__init__()
+
+    def __call__(self, key, build):
+        try:
+            ret = self._cache[key]
+        except KeyError:
+            self.misses += 1
+            ret = build()
+            if len(self._cache) >= self.maxsize:
+                self._cache.clear()
+            self._cache[key] = ret
+        else:
+            self.hits += 1
+        return ret
+
+    def info(self):
+        """ Returns hit and miss counters, and cache size """
+        return LookupCacheInfo(self.hits, self.misses, self.maxsize, len(self._cache))
+
+    def clear(self):
+        """ Empties the cache and resets counters """
+        self._cache.clear()
+        self.hits = self.misses = 0
+
+lookup_cache = LookupCache()
+
+SelectRelatedPlan = namedtuple('SelectRelatedPlan',
+                               'related_queries translation_queries forced_unique_fields')
+
+select_related_cache = LookupCache()
+
 #===============================================================================
 
 class ValuesMixin(object):
     _skip_master_select = True
 
     def iterator(self):
-        qs = self._clone()._add_language_filter()
+        qs = self._for_query()
         for row in super(ValuesMixin, qs).iterator():
             if isinstance(row, dict):
                 yield qs._reverse_translate_fieldnames_dict(row)
@@ -94,63 +176,450 @@ class SkipMasterSelectMixin(object):
     _skip_master_select = True
 
 #===============================================================================
+# Records
+#===============================================================================
+
+_row_classes = {}
+
+def get_row_class(model, names):
+    """ Get the namedtuple class used for records of model having the given
+        field names. Classes are built once and shared by all querysets.
+    """
+    key = (model, names)
+    try:
+        return _row_classes[key]
+    except KeyError:
+        klass = _row_classes[key] = namedtuple('%sRow' % model.__name__, names)
+        return klass
+
+class NamedValuesListQuerySet(ValuesListQuerySet):
+    """ A values_list() queryset yielding namedtuple records, whose fields are
+        named after _named_fields instead of the actual lookups in _fields.
+    """
+    def iterator(self):
+        make_row = partial(tuple.__new__, get_row_class(self._row_model, self._named_fields))
+        for row in super(NamedValuesListQuerySet, self).iterator():
+            yield make_row(row)
+
+    def _clone(self, *args, **kwargs):
+        clone = super(NamedValuesListQuerySet, self)._clone(*args, **kwargs)
+        if not hasattr(clone, '_named_fields'):
+            clone._named_fields = self._named_fields
+            clone._row_model = self._row_model
+        return clone
+
+#===============================================================================
+
+# Fields currently forced unique, by id, along with their nesting count
+_forced_unique = threading.local()
+
+class ForceableUniqueMixin(object):
+    """ Field mixin allowing ForcedUniqueFields to make the field unique,
+        for the current thread only.
+    """
+    @property
+    def unique(self):
+        if self._unique or self.primary_key:
+            return True
+        forced = getattr(_forced_unique, 'fields', None)
+        return bool(forced) and id(self) in forced
+
+_forceable_classes = {}
+
+def make_unique_forceable(field):
+    """ Turn field into a field that can be forced unique by ForcedUniqueFields.
+        The generated class keeps the name and module of the original one, so
+        that migrations and introspection see no difference.
+    """
+    klass = field.__class__
+    if not issubclass(klass, ForceableUniqueMixin):
+        try:
+            forceable = _forceable_classes[klass]
+        except KeyError:
+            forceable = type(klass.__name__, (ForceableUniqueMixin, klass),
+                             {'__module__': klass.__module__})
+            _forceable_classes[klass] = forceable
+        field.__class__ = forceable
+    return field
 
 class ForcedUniqueFields(object):
-    """ Context manager that forces a set of fields to be unique while active """
+    """ Context manager that forces a set of fields to be unique while active.
+        Field metadata is never modified: forced fields are tracked in a thread
+        local, so concurrent queries in other threads are not affected.
+    """
     def __init__(self, fields):
+        for field in fields:
+            assert isinstance(field, ForceableUniqueMixin), \
+                'Field %r cannot be forced unique' % field
         self.fields = fields
 
     def __enter__(self):
+        try:
+            forced = _forced_unique.fields
+        except AttributeError:
+            forced = _forced_unique.fields = {}
         for field in self.fields:
-            field._unique = True
+            forced[id(field)] = forced.get(id(field), 0) + 1
 
     def __exit__(self, *args):
+        forced = _forced_unique.fields
         for field in self.fields:
-            field._unique = False
+            count = forced.pop(id(field)) - 1
+            if count:
+                forced[id(field)] = count
+
+def forced_unique_iterator(iterator, fields):
+    """ Iterate over a queryset iterator, forcing a set of fields to be unique
+        while the first row is fetched.
+        Django compiles the query and builds its row decoding information when
+        the first row is requested, this is the only step that depends on field
+        uniqueness. Remaining rows are then streamed from the cursor.
+    """
+    with ForcedUniqueFields(fields):
+        try:
+            first = next(iterator)
+        except StopIteration:
+            return
+    yield first
+    for obj in iterator:
+        yield obj
+
+def related_translations_setter(relations):
+    """ Build a function that moves translations brought in by select_related
+        to the translations cache of related objects, following relations, the
+        select_related dictionary of a query. Django caches related translations
+        in a different place than hvad expects it.
+        Attribute names are looked up once per class.
+    """
+    children = [(name, related_translations_setter(sub_relations))
+                for name, sub_relations in relations.items()]
+    cache_names = {}
+
+    def use_related_translations(obj):
+        # First, set translation for current object,
+        klass = obj.__class__
+        try:
+            names = cache_names[klass]
+        except KeyError:
+            try:
+                accessor = klass._meta.translations_accessor
+            except AttributeError:
+                names = None
+            else:
+                names = (getattr(klass, accessor).related.get_cache_name(),
+                         klass._meta.translations_cache)
+            cache_names[klass] = names
+        if names is not None:
+            attrs = obj.__dict__
+            if names[0] in attrs:
+                attrs[names[1]] = attrs.pop(names[0])
+
+        # Then recurse in the relations
+        for name, setter in children:
+            target = getattr(obj, name)
+            if target is not None:
+                setter(target)
+    return use_related_translations
+
+def loading_translations(iterator):
+    """ Decorator for queryset iterator methods, handling the translations of
+        returned instances by chunks: loading them when prefetch_translations()
+        was used, and sharing a TranslationsBatch between the instances of a
+        chunk when batch_translations() was used.
+    """
+    @wraps(iterator)
+    def wrapper(self):
+        objects = iterator(self)
+        languages = getattr(self, '_prefetch_languages', None)
+        if languages is None and not self._batch_translations:
+            return objects
+        if languages is not None:
+            languages = tuple(get_language() if lang is None else lang
+                              for lang in languages)
+        return _loading_translations_iterator(objects, languages,
+                                              self._batch_translations, self.db)
+    return wrapper
+
+def _loading_translations_iterator(objects, languages, batch, using):
+    while True:
+        chunk = list(islice(objects, CHUNK_SIZE))
+        if not chunk:
+            return
+        translatable = [obj for obj in chunk
+                        if hasattr(obj._meta, 'translations_accessor')]
+        if languages is not None:
+            # empty tuple means all languages
+            prefetch_translations(translatable, languages or None, using)
+        if batch and translatable:
+            siblings = TranslationsBatch(translatable, using)
+            for obj in translatable:
+                setattr(obj, obj._meta.translations_batch, siblings)
+        for obj in chunk:
+            yield obj
+
+def iterate_batches(queryset, size, keys=None):
+    """ Iterate a queryset in lists of up to size objects, ordering it on keys
+        and filtering each batch on keys being past the last object of previous
+        batch. Keys must be field names that, together, are unique. They are
+        ascending, unless prefixed with a minus sign, and default to the pk.
+    """
+    assert size > 0
+    if keys is None:
+        keys = ('pk',)
+    names = [key.lstrip('-') for key in keys]
+    lookups = ['%s__%s' % (name, 'lt' if key.startswith('-') else 'gt')
+               for key, name in zip(keys, names)]
+    queryset = queryset.order_by(*keys)
+    batch_qs = queryset
+    while True:
+        batch = list(batch_qs[:size])
+        if batch:
+            yield batch
+        if len(batch) < size:
+            return
+        # rows past (v1, v2, ...) are: k1>v1 OR (k1=v1 AND k2>v2) OR ...
+        values = [getattr(batch[-1], name) for name in names]
+        condition = Q()
+        for index, lookup in enumerate(lookups):
+            condition |= Q(*[Q(**{name: value}) for name, value
+                             in zip(names[:index], values[:index])],
+                           **{lookup: values[index]})
+        batch_qs = queryset.filter(condition)
+
+class LoadingOptionsMixin(object):
+    """ Queryset methods shared by translation and fallback querysets, setting
+        how results are loaded and counted.
+    """
+    def fallback_strategy(self, strategy):
+        check_fallback_strategy(strategy)
+        self._fallback_strategy = strategy
+        return self
+
+    def prefetch_translations(self, *languages):
+        if languages == (None,):
+            self._prefetch_languages = None
+        else:
+            self._prefetch_languages = languages
+        return self
+
+    def memoize_count(self, enabled=True):
+        self._memoize_count = enabled
+        self._count_cache = None
+        return self
+
+    def iterate_batches(self, size=1000, keys=None):
+        return iterate_batches(self, size, keys)
 
 #===============================================================================
 # Field for language joins
 #===============================================================================
 
 class RawConstraint(object):
-    def __init__(self, sql, aliases):
+    def __init__(self, sql, aliases, params=()):
         self.sql = sql
         self.aliases = aliases
+        self.params = params
 
     def as_sql(self, qn, connection):
         aliases = tuple(qn(alias) for alias in self.aliases)
-        return (self.sql % aliases, [])
+        return (self.sql % aliases, list(self.params))
+
+def _unique_languages(languages):
+    # Filter out duplicates, while preserving order
+    result = []
+    seen = set()
+    for lang in languages:
+        if lang not in seen:
+            seen.add(lang)
+            result.append(lang)
+    return tuple(result)
 
 class BetterTranslationsField(object):
+    # Language codes are passed as parameters, so the SQL only depends on
+    # the number of languages. It is built once for each length.
+    _sql_cache = {}
+
     def __init__(self, translation_fallbacks):
-        # Filter out duplicates, while preserving order
-        self._fallbacks = []
-        seen = set()
-        for lang in translation_fallbacks:
-            if lang not in seen:
-                seen.add(lang)
-                self._fallbacks.append(lang)
+        self._fallbacks = _unique_languages(translation_fallbacks)
+
+    @classmethod
+    def _get_sql(cls, count):
+        try:
+            sql = cls._sql_cache[count]
+        except KeyError:
+            langcase = ('(CASE %s.language_code ' +
+                        ' '.join('WHEN %%%%s THEN %d' % i for i in range(count)) +
+                        ' ELSE %d END)' % count)
+            sql = ' '.join((langcase, '<', langcase, 'OR ('
+                            '%s.language_code = %s.language_code AND '
+                            '%s.id < %s.id)'))
+            cls._sql_cache[count] = sql
+        return sql
 
     def get_extra_restriction(self, where_class, alias, related_alias):
-        langcase = ('(CASE %s.language_code ' +
-                    ' '.join('WHEN \'%s\' THEN %d' % (lang, i)
-                             for i, lang in enumerate(self._fallbacks)) +
-                    ' ELSE %d END)' % len(self._fallbacks))
         return RawConstraint(
-            sql=' '.join((langcase, '<', langcase, 'OR ('
-                          '%s.language_code = %s.language_code AND '
-                          '%s.id < %s.id)')),
+            sql=self._get_sql(len(self._fallbacks)),
             aliases=(alias, related_alias,
                      alias, related_alias,
-                     alias, related_alias)
+                     alias, related_alias),
+            params=self._fallbacks * 2
         )
 
 
+class WindowFallbackRanking(object):
+    """
+    Restricts a translations table to the best translation of each master
+    using the ROW_NUMBER() window function, as an alternative to the self-join
+    of BetterTranslationsField. Ranking SQL is built once per model, database
+    vendor and number of languages, language codes being parameters.
+    Only translations matching a restriction are ranked, so the cost does
+    not depend on the size of the whole translations table.
+    """
+    _sql_cache = {}
+
+    def __init__(self, model, translation_fallbacks):
+        self.model = model
+        self._fallbacks = _unique_languages(translation_fallbacks)
+
+    def _get_sql(self, connection):
+        """ Returns the head and tail of the ranking query, the restriction
+            of ranked translations going in between
+        """
+        count = len(self._fallbacks)
+        key = (self.model, connection.vendor, count)
+        try:
+            return self._sql_cache[key]
+        except KeyError:
+            qn = connection.ops.quote_name
+            opts = self.model._meta
+            pk, table = qn(opts.pk.column), qn(opts.db_table)
+            master = qn(opts.get_field('master').column)
+            language = qn(opts.get_field('language_code').column)
+            ranking = ('CASE %s ' % language +
+                       ' '.join('WHEN %%s THEN %d' % i for i in range(count)) +
+                       ' ELSE %d END' % count)
+            sql = ('SELECT %s FROM (SELECT %s, ROW_NUMBER() OVER ('
+                   'PARTITION BY %s ORDER BY %s, %s) AS hvad_rank FROM %s' % (
+                   pk, pk, master, ranking, pk, table),
+                   ') hvad_ranked WHERE hvad_rank = 1')
+            self._sql_cache[key] = sql
+            return sql
+
+    def get_subquery(self, connection, restriction=None):
+        """ Returns the (sql, params) of a query selecting best translations' pk.
+            restriction is a (sql, params) condition on the translations table,
+            only translations matching it are ranked. Without it, the whole
+            table is ranked.
+        """
+        head, tail = self._get_sql(connection)
+        if restriction is None:
+            return head + tail, list(self._fallbacks)
+        sql, params = restriction
+        return '%s WHERE %s%s' % (head, sql, tail), list(self._fallbacks) + list(params)
+
+    def get_extra_where(self, connection, alias):
+        """ Returns the (sql, params) restriction for given table alias. Ranked
+            translations are correlated to the master of the row being checked.
+        """
+        qn = connection.ops.quote_name
+        opts = self.model._meta
+        # Like Django, only quote aliases that are table names
+        if alias == opts.db_table:
+            alias = qn(alias)
+        master = qn(opts.get_field('master').column)
+        sql, params = self.get_subquery(connection, ('%s = %s.%s' % (master, alias, master), ()))
+        return '%s.%s IN (%s)' % (alias, qn(opts.pk.column), sql), params
+
+
+class BestTranslationsSubquery(object):
+    """
+    Lookup value selecting the pk of the best translation of each master,
+    following the given fallbacks, for use in '__in' filters. It ranks
+    translations with WindowFallbackRanking or BetterTranslationsField,
+    depending on the strategy. Only translations of masters, a flat values
+    queryset, are considered.
+    """
+    def __init__(self, model, translation_fallbacks, masters, strategy=None):
+        self.model = model
+        self._fallbacks = _unique_languages(translation_fallbacks)
+        self._masters = masters
+        self._strategy = strategy
+
+    def _prepare(self):
+        return self
+
+    def _as_sql(self, connection):
+        qn = connection.ops.quote_name
+        opts = self.model._meta
+        master = qn(opts.get_field('master').column)
+        masters_sql, masters_params = self._masters._as_sql(connection)
+
+        if use_window_fallbacks(self._strategy, connection):
+            return (WindowFallbackRanking(self.model, self._fallbacks)
+                    .get_subquery(connection, ('%s IN (%s)' % (master, masters_sql),
+                                               masters_params)))
+        restriction, params = (BetterTranslationsField(self._fallbacks)
+                               .get_extra_restriction(None, 'hvad_t2', 'hvad_t1')
+                               .as_sql(lambda alias: alias, connection))
+        sql = ('SELECT hvad_t1.%s FROM %s hvad_t1 LEFT OUTER JOIN %s hvad_t2 '
+               'ON (hvad_t1.%s = hvad_t2.%s AND (%s)) '
+               'WHERE hvad_t1.%s IN (%s) AND hvad_t2.%s IS NULL' % (
+               qn(opts.pk.column), qn(opts.db_table), qn(opts.db_table),
+               master, master, restriction, master, masters_sql, qn(opts.pk.column)))
+        return sql, params + list(masters_params)
+
+
+def supports_window_functions(connection):
+    """ Tells whether the database behind connection has window functions,
+        and accepts references to the outer query inside derived tables, as
+        the window ranking is correlated to the masters being filtered.
+        MariaDB, Oracle and MySQL before 8.0.14 do not.
+    """
+    if connection.vendor == 'sqlite':
+        from django.db.backends.sqlite3.base import Database
+        return Database.sqlite_version_info >= (3, 25, 0)
+    if connection.vendor == 'mysql':
+        if connection.connection is None:
+            connection.cursor()             # connect, so server info is available
+        server_info = connection.connection.get_server_info()
+        if 'mariadb' in server_info.lower():
+            return False
+        match = re.match(r'(\d+)\.(\d+)\.(\d+)', server_info)
+        return tuple(int(bit) for bit in match.groups()) >= (8, 0, 14)
+    return connection.vendor == 'postgresql'
+
+
+def use_window_fallbacks(strategy, connection):
+    """ Tells whether fallbacks should be resolved using window functions.
+        Falls back to the self-join if the database does not support them.
+    """
+    if (strategy or FALLBACK_STRATEGY) != 'window':
+        return False
+    return supports_window_functions(connection)
+
+
 #===============================================================================
 # TranslationQueryset
 #===============================================================================
 
-class TranslationQueryset(QuerySet):
+TranslationQuerysetState = namedtuple('TranslationQuerysetState',
+    'language_code language_fallbacks fallback_strategy prefetch_languages '
+    'memoize_count raw_select_related switch_fields')
+
+_default_state = TranslationQuerysetState(None, None, None, None, False, (), ())
+
+def state_attribute(name):
+    """ Property exposing a field of the queryset state. The state is immutable
+        and shared by clones, so setting a field replaces the state of this
+        queryset only.
+    """
+    def fget(self):
+        return getattr(self._hvad_state, name)
+    def fset(self, value):
+        self._hvad_state = self._hvad_state._replace(**{name: value})
+    return property(fget, fset)
+
+class TranslationQueryset(LoadingOptionsMixin, QuerySet):
     """
     This is where things happen.
     To fully understand this project, you have to understand this class.
@@ -167,6 +636,17 @@ class TranslationQueryset(QuerySet):
     if django.VERSION >= (1, 6):
         override_classes[DateTimeQuerySet] = SkipMasterSelectMixin
     _skip_master_select = False
+    _required_field_names = ('master', 'language_code')
+    _batch_translations = False
+    _single_use = False
+
+    _language_code = state_attribute('language_code')
+    _language_fallbacks = state_attribute('language_fallbacks')
+    _fallback_strategy = state_attribute('fallback_strategy')
+    _prefetch_languages = state_attribute('prefetch_languages')
+    _memoize_count = state_attribute('memoize_count')
+    _raw_select_related = state_attribute('raw_select_related')
+    _hvad_switch_fields = state_attribute('switch_fields')
 
     def __init__(self, model, *args, **kwargs):
         if hasattr(model._meta, 'translations_model'):
@@ -174,14 +654,10 @@ class TranslationQueryset(QuerySet):
             model, self.shared_model = model._meta.translations_model, model
         elif not hasattr(model._meta, 'shared_model'):
             raise TypeError('TranslationQueryset only works on translatable models')
-        self._local_field_names = None
-        self._field_translator = None
-        self._language_code = None
-        self._language_fallbacks = None
-        self._raw_select_related = []
-        self._forced_unique_fields = []  # Used for select_related
+        self._hvad_state = _default_state
+        self._count_cache = None
+        self._forced_unique_fields = ()  # Used for select_related
         self._language_filter_tag = False
-        self._hvad_switch_fields = ()
         super(TranslationQueryset, self).__init__(model, *args, **kwargs)
 
     #===========================================================================
@@ -191,48 +667,50 @@ class TranslationQueryset(QuerySet):
     def _clone(self, klass=None, setup=False, **kwargs):
         """ Creates a clone of this queryset - Django equivalent of copy()
         This method keeps all defining attributes and drops data caches
+        Defining attributes are held in an immutable state, shared with clones.
         """
         kwargs.update({
             'shared_model': self.shared_model,
-            '_local_field_names': self._local_field_names,
-            '_field_translator': self._field_translator,
-            '_language_code': self._language_code,
-            '_language_fallbacks': self._language_fallbacks,
-            '_raw_select_related': self._raw_select_related,
-            '_forced_unique_fields': list(self._forced_unique_fields),
+            '_hvad_state': self._hvad_state,
+            '_forced_unique_fields': self._forced_unique_fields,
             '_language_filter_tag': getattr(self, '_language_filter_tag', False),
-            '_hvad_switch_fields': self._hvad_switch_fields,
         })
         klass = self.__class__ if klass is None else self._get_class(klass)
         return super(TranslationQueryset, self)._clone(klass, setup, **kwargs)
 
     @property
     def field_translator(self):
-        if self._field_translator is None:
-            self._field_translator = FieldTranslator(self)
-        return self._field_translator
+        return self.shared_model._meta.translations_routing.field_translator
 
     @property
     def shared_local_field_names(self):
-        if self._local_field_names is None:
-            self._local_field_names = self.shared_model._meta.get_all_field_names()
-        return self._local_field_names
+        return self.shared_model._meta.translations_routing.shared
 
     def _translate_args_kwargs(self, *args, **kwargs):
-        # Translate args (Q objects) from '<shared_field>' to
-        # 'master__<shared_field>' where necessary.
-        newargs = deepcopy(args)
-        for q in newargs:
-            for child, children, index in q_children(q):
-                children[index] = (self.field_translator(child[0]), child[1])
-        # Translated kwargs from '<shared_field>' to 'master__<shared_field>'
-        # where necessary.
-        newkwargs = dict((self.field_translator(key), value)
-                         for key, value in kwargs.items())
+        # Translate lookups from '<shared_field>' to 'master__<shared_field>'
+        # where necessary. This only depends on lookup keys, so the result is
+        # cached by shape, then Q objects are rebuilt with the new keys.
+        arg_keys = tuple(tuple(q_keys(q)) for q in args)
+        kwarg_keys = tuple(kwargs)
+        new_arg_keys, new_kwarg_keys = lookup_cache(
+            (self.model, tuple(self.query.aggregates), arg_keys, kwarg_keys),
+            lambda: (tuple(tuple(self._translate_fieldnames(keys)) for keys in arg_keys),
+                     tuple(self._translate_fieldnames(kwarg_keys))))
+        newargs = tuple(q_rewrite(q, iter(keys)) for q, keys in zip(args, new_arg_keys))
+        newkwargs = dict((new_key, kwargs[key])
+                         for key, new_key in zip(kwarg_keys, new_kwarg_keys))
         return newargs, newkwargs
 
+    def _translate_fieldname(self, name):
+        # Annotations are on the translations model, they must not be translated
+        key = name[1:] if name.startswith('-') else name
+        for alias in self.query.aggregates:
+            if key == alias or key.startswith(alias + '__'):
+                return name
+        return self.field_translator(name)
+
     def _translate_fieldnames(self, fieldnames):
-        return [self.field_translator(name) for name in fieldnames]
+        return [self._translate_fieldname(name) for name in fieldnames]
 
     def _reverse_translate_fieldnames_dict(self, fieldname_dict):
         """
@@ -275,10 +753,19 @@ class TranslationQueryset(QuerySet):
         # update using the real manager
         return QuerySet(self.shared_model, using=self.db).filter(**{'%s__in' % accessor: qs})
 
-    def _add_select_related(self, language_code):
+    def _get_select_related_plan(self):
+        """ Resolve select_related paths into the related queries to add, the
+            translation paths whose language must be filtered and the fields
+            to force unique. Plans only depend on the queryset shape, they are
+            cached and shared by all querysets on the same model.
+        """
         fields = self._raw_select_related
+        return select_related_cache((self.shared_model, self._skip_master_select, fields),
+                                    lambda: self._build_select_related_plan(fields))
+
+    def _build_select_related_plan(self, fields):
         related_queries = [] if self._skip_master_select else ['master']
-        language_filters = []
+        translation_queries = []
         force_unique_fields = []
 
         for query_key in fields:
@@ -321,18 +808,16 @@ class TranslationQueryset(QuerySet):
                 # If target is a translated model, select its translations
                 if hasattr(target._meta, 'translations_accessor'):
                     # Add the model
-                    target_query = '__'.join(bits[:depth+1])
-                    related_queries.append('%s__%s' % (
-                        target_query,
-                        target._meta.translations_accessor
-                    ))
-
-                    # Add a language filter for the translation
                     target_translations = target._meta.translations_accessor
-                    language_filters.append('%s__%s__language_code' % (
-                        target_query,
-                        target_translations,
-                    ))
+                    query = '%s__%s' % ('__'.join(bits[:depth+1]), target_translations)
+                    related_queries.append(query)
+
+                    # Remember the translation, to filter its language, along
+                    # with the path to the target, to find its masters
+                    translation_queries.append((target._meta.translations_model,
+                                                '%s__language_code' % query,
+                                                '%s__pk__in' % query,
+                                                '__'.join(bits[:depth+1])))
 
                     # Remember to mark the field unique so JOIN is generated
                     # and row decoder gets cached items
@@ -342,13 +827,44 @@ class TranslationQueryset(QuerySet):
                 model = target
             related_queries.append('__'.join(bits))
 
-        # Apply results to query
-        self.query.add_select_related(related_queries)
-        for language_filter in language_filters:
-            self.query.add_q(Q(**{language_filter: language_code}) |
-                             Q(**{language_filter: None}))
+        return SelectRelatedPlan(tuple(related_queries), tuple(translation_queries),
+                                 tuple(force_unique_fields))
+
+    def _add_select_related(self, language_code, fallbacks=None, masters_query=None):
+        """ Select related models along with their translations in language_code,
+            which may be an F() expression. If fallbacks are given, they are
+            used instead to select the best translation of each related object.
+            Only the translations of related objects matching masters_query,
+            the query before language filtering, are ranked.
+        """
+        plan = self._get_select_related_plan()
 
-        self._forced_unique_fields = force_unique_fields
+        # Apply plan to query
+        self.query.add_select_related(plan.related_queries)
+        for model, language_lookup, pk_lookup, target_path in plan.translation_queries:
+            if fallbacks is None:
+                language_filter = Q(**{language_lookup: language_code})
+            else:
+                masters = (QuerySet(self.model, query=masters_query, using=self.db)
+                           .values_list(target_path, flat=True))
+                subquery = BestTranslationsSubquery(model, fallbacks, masters,
+                                                    self._fallback_strategy)
+                language_filter = Q(**{pk_lookup: subquery})
+            self.query.add_q(language_filter | Q(**{language_lookup: None}))
+
+        self._forced_unique_fields = plan.forced_unique_fields
+
+    def _for_query(self):
+        """ Get a language-filtered queryset to run a single query with.
+            Querysets flagged as single use are only created internally to run
+            one query, by get() and in_bulk(), they are filtered in place.
+            Others, including all querysets user code holds, are cloned first,
+            so they can be evaluated and refined again.
+        """
+        if self._single_use:
+            self._single_use = False
+            return self._add_language_filter()
+        return self._clone()._add_language_filter()
 
     def _add_language_filter(self):
         if self._language_filter_tag:
@@ -356,29 +872,36 @@ class TranslationQueryset(QuerySet):
         self._language_filter_tag = True
 
         if self._language_code == 'all':
-            if self._raw_select_related:
-                raise NotImplementedError('Using select_related along with '
-                                          'language(\'all\') is not supported')
-
-            self.query.add_select_related(('master',))
+            # related translations must match the language of each row
+            self._add_select_related(F('language_code'))
 
         elif self._language_fallbacks:
-            if self._raw_select_related:
-                raise NotImplementedError('Using select_related along with '
-                                          'fallbacks() is not supported')
             languages = tuple(get_language() if lang is None else lang
                               for lang in (self._language_code,) + self._language_fallbacks)
-
-            masteratt = self.model._meta.get_field('master').attname
-            nullable = ({'nullable': True} if django.VERSION >= (1, 7) else
-                        {'nullable': True, 'outer_if_first': True})
-            alias = self.query.join((self.query.get_initial_alias(), self.model._meta.db_table,
-                                     ((masteratt, masteratt),)),
-                                    join_field=BetterTranslationsField(languages),
-                                    **nullable)
-            self.query.add_extra(None, None, ('%s.id IS NULL'%alias,), None, None, None)
+            masters_query = None
+            if self._raw_select_related:
+                # related translations are ranked for matching rows only
+                masters_query = self.query.clone()
+                masters_query.clear_limits()
+                masters_query.clear_ordering(force_empty=True)
+
+            connection = connections[self.db]
+            if use_window_fallbacks(self._fallback_strategy, connection):
+                ranking = WindowFallbackRanking(self.model, languages)
+                sql, params = ranking.get_extra_where(connection, self.query.get_initial_alias())
+                self.query.add_extra(None, None, (sql,), params, None, None)
+            else:
+                masteratt = self.model._meta.get_field('master').attname
+                nullable = ({'nullable': True} if django.VERSION >= (1, 7) else
+                            {'nullable': True, 'outer_if_first': True})
+                alias = self.query.join((self.query.get_initial_alias(), self.model._meta.db_table,
+                                         ((masteratt, masteratt),)),
+                                        join_field=BetterTranslationsField(languages),
+                                        **nullable)
+                self.query.add_extra(None, None, ('%s.id IS NULL'%alias,), None, None, None)
             self.query.add_filter(('master__pk__isnull', False))
-            self.query.add_select_related(('master',))
+            self._add_select_related(languages[0], fallbacks=languages,
+                                     masters_query=masters_query)
 
         else:
             language_code = self._language_code or get_language()
@@ -402,34 +925,37 @@ class TranslationQueryset(QuerySet):
 
         return self
 
-    def _use_related_translations(self, obj, relations_dict, depth=0):
+    def _get_masters_queryset(self):
         """
-        Ensure that we use cached translations brought in via select_related if
-        available. Necessary since the database select_related query caches the
-        related translation models in a different place than hvad expects it.
+        Fallbacks return one translation for every master having any, so unless
+        a filter depends on which translation is picked, cardinality only
+        depends on masters. In that case, this returns a plain queryset on
+        translations that have a master matching filters. Otherwise, returns
+        None and the fallback query must be run in full.
         """
-
-        # First, set translation for current object,
-        try:
-            accessor = obj._meta.translations_accessor
-        except AttributeError:
-            pass
-        else:
-            cache = getattr(obj.__class__, accessor).related.get_cache_name()
-            try:
-                translation = getattr(obj, cache)
-            except AttributeError:
-                pass
-            else:
-                delattr(obj, cache)
-                setattr(obj, obj._meta.translations_cache, translation)
-
-        # Then recurse in the relation dict
-        for field, sub_dict in relations_dict.items():
-            target = getattr(obj, field)
-            if target is not None:
-                self._use_related_translations(target, sub_dict, depth+1)
-
+        if not self._language_fallbacks or self._language_code == 'all':
+            return None
+        query = self.query.clone()
+        if (query.low_mark or query.high_mark is not None or query.distinct or
+            query.aggregates or query.extra or query.extra_tables or
+            query.group_by is not None):
+            return None
+
+        initial_alias = query.get_initial_alias()
+        master_column = self.model._meta.get_field('master').column
+        for alias in where_node_aliases(query.where):
+            if alias is None or alias == initial_alias:
+                return None
+            # Walk joins back to the translations table, ensuring the
+            # constraint was reached through the master
+            while query.alias_map[alias].lhs_alias != initial_alias:
+                alias = query.alias_map[alias].lhs_alias
+            if query.alias_map[alias].join_cols[0][0] != master_column:
+                return None
+
+        query.clear_ordering(force_empty=True)
+        qs = QuerySet(model=self.model, query=query, using=self.db)
+        return qs.filter(master__isnull=False)
 
     #===========================================================================
     # Queryset/Manager API
@@ -449,10 +975,20 @@ class TranslationQueryset(QuerySet):
             self._language_fallbacks = fallbacks
         return self
 
+    @minimumDjangoVersion(1, 6)
+    def fallback_strategy(self, strategy):
+        return super(TranslationQueryset, self).fallback_strategy(strategy)
+
     #===========================================================================
     # Queryset/Manager API that do database queries
     #===========================================================================
 
+    def iterate_batches(self, size=1000, keys=None):
+        if keys is None and self._language_code == 'all':
+            keys = ('pk', 'language_code')
+        return super(TranslationQueryset, self).iterate_batches(size, keys)
+
+    @loading_translations
     def iterator(self):
         """
         If this queryset is not filtered by a language code yet, it should be
@@ -461,7 +997,8 @@ class TranslationQueryset(QuerySet):
         If someone doesn't want a queryset filtered by language, they should use
         Model.objects.untranslated()
         """
-        qs = self._clone()._add_language_filter()
+        known_related_objects = self._known_related_objects
+        qs = self._for_query()
         qs._known_related_objects = {}  # super's iterator will attempt to set them
 
         if qs._forced_unique_fields:
@@ -470,52 +1007,70 @@ class TranslationQueryset(QuerySet):
             # certain fields as one-to-one relations
             # before this queryset calls get_cached_row()
             # We change it back so that things get reset to normal
-            # before execution returns to user code.
+            # before execution returns to user code. This happens as soon
+            # as the first row is fetched, so the rest can be streamed.
             # It would be more direct and robust if we could wrap
             # django.db.models.query.get_cached_row() instead, but that's not a class
             # method, sadly, so we cannot override it just for this query
-
-            with ForcedUniqueFields(qs._forced_unique_fields):
-                # Pre-fetch all objects:
-                objects = list(super(TranslationQueryset, qs).iterator())
-
-            if type(qs.query.select_related) == dict:
-                for obj in objects:
-                    qs._use_related_translations(obj, qs.query.select_related)
+            objects = forced_unique_iterator(super(TranslationQueryset, qs).iterator(),
+                                             qs._forced_unique_fields)
+            if type(qs.query.select_related) == dict and qs.query.select_related:
+                use_related_translations = related_translations_setter(qs.query.select_related)
+            else:
+                use_related_translations = None
         else:
             objects = super(TranslationQueryset, qs).iterator()
+            use_related_translations = None
+
+        # Work out per-row processing once, before the loop
+        switch_fields = self._hvad_switch_fields
+        shared_model = qs.shared_model
+        proxy = shared_model._meta.proxy
+        cast_from = cast_to = None
+        translations_cache = shared_model._meta.translations_cache
+        # use known objects saved before we cleared them
+        if django.VERSION >= (1, 6):
+            known_related = [(field.get_cache_name(), field.get_attname(), field.name, rel_objs)
+                             for field, rel_objs in known_related_objects.items()]
+            kro_attname, kro_instance = None, None
+        else:
+            known_related = ()
+            kro_attname, kro_instance = (getattr(self, 'known_related_object', None)
+                                         or (None, None))
 
         for obj in objects:
+            if use_related_translations is not None:
+                use_related_translations(obj)
+            master = obj.master
             # non-cascade-deletion hack:
-            if not obj.master:
+            if master is None:
                 yield obj
-            else:
-                for name in self._hvad_switch_fields:
-                    try:
-                        setattr(obj.master, name, getattr(obj, name))
-                    except AttributeError:
-                        pass
-                    else:
-                        delattr(obj, name)
-                obj = combine(obj, qs.shared_model)
-                # use known objects from self, not qs as we cleared it earlier
-                if django.VERSION >= (1, 6):
-                    for field, rel_objs in self._known_related_objects.items():
-                        if hasattr(obj, field.get_cache_name()):
-                            continue # field was already cached
-                        pk = getattr(obj, field.get_attname())
-                        try:
-                            rel_obj = rel_objs[pk]
-                        except KeyError:
-                            pass
-                        else:
-                            setattr(obj, field.name, rel_obj)
+                continue
+
+            if switch_fields:
+                attrs = obj.__dict__
+                for name in switch_fields:
+                    if name in attrs:
+                        setattr(master, name, attrs.pop(name))
+            # same as combine(obj, shared_model)
+            if proxy:
+                if master.__class__ is not cast_from:
+                    cast_from = master.__class__
+                    cast_to = get_proxy_class(shared_model, cast_from)
+                master.__class__ = cast_to
+            setattr(master, translations_cache, obj)
+            for cache_name, attname, name, rel_objs in known_related:
+                if hasattr(master, cache_name):
+                    continue # field was already cached
+                try:
+                    rel_obj = rel_objs[getattr(master, attname)]
+                except KeyError:
+                    pass
                 else:
-                    kro_attname, kro_instance = (getattr(self, 'known_related_object', None)
-                                                 or (None, None))
-                    if kro_instance:
-                        setattr(obj, kro_attname, kro_instance)
-                yield obj
+                    setattr(master, name, rel_obj)
+            if kro_instance:
+                setattr(master, kro_attname, kro_instance)
+            yield master
 
     def create(self, **kwargs):
         if 'language_code' not in kwargs:
@@ -531,19 +1086,52 @@ class TranslationQueryset(QuerySet):
         obj.save(force_insert=True, using=self.db)
         return obj
 
+    def get(self, *args, **kwargs):
+        """
+        Same as Django's, but the filtered clone is only used for a single
+        query, so it is language-filtered in place instead of cloned again.
+        """
+        qs = self.filter(*args, **kwargs)
+        if self.query.can_filter():
+            qs = qs.order_by()
+        qs._single_use = True
+        num = len(qs)
+        if num == 1:
+            return qs._result_cache[0]
+        if not num:
+            raise self.model.DoesNotExist(
+                '%s matching query does not exist.' % self.model._meta.object_name)
+        raise self.model.MultipleObjectsReturned(
+            'get() returned more than one %s -- it returned %s!' %
+            (self.model._meta.object_name, num))
+
     def count(self):
-        if self._result_cache is None:
-            qs = self._clone()._add_language_filter()
-            return super(TranslationQueryset, qs).count()
-        else:
+        if self._result_cache is not None:
             return len(self._result_cache)
+        if self._count_cache is not None:
+            return self._count_cache
 
-    def exists(self):
-        if self._result_cache is None:
-            qs = self._clone()._add_language_filter()
-            return super(TranslationQueryset, qs).exists()
+        qs = self._get_masters_queryset()
+        if qs is not None:
+            count = qs.values('master').distinct().count()
         else:
+            qs = self._for_query()
+            count = super(TranslationQueryset, qs).count()
+        if self._memoize_count:
+            self._count_cache = count
+        return count
+
+    def exists(self):
+        if self._result_cache is not None:
             return bool(self._result_cache)
+        if self._count_cache is not None:
+            return bool(self._count_cache)
+
+        qs = self._get_masters_queryset()
+        if qs is not None:
+            return qs.exists()
+        qs = self._for_query()
+        return super(TranslationQueryset, qs).exists()
 
     def get_or_create(self, **kwargs):
         """
@@ -554,53 +1142,222 @@ class TranslationQueryset(QuerySet):
         assert kwargs, \
                 'get_or_create() must be passed at least one keyword argument'
         defaults = kwargs.pop('defaults', {})
-        lookup = kwargs.copy()
-        for f in self.model._meta.fields:
-            if f.attname in lookup:
-                lookup[f.name] = lookup.pop(f.attname)
+        lookup = self._extract_lookup(kwargs)
         try:
             self._for_write = True
             return self.get(**lookup), False
         except self.model.DoesNotExist:
-            try:
-                params = dict([(k, v) for k, v in kwargs.items() if '__' not in k])
-                params.update(defaults)
-                # START PATCH
-                if 'language_code' not in params:
-                    params['language_code'] = self._language_code or get_language()
-                else:
-                    warnings.warn('Overriding language_code in get_or_create() is deprecated. '
-                                  'Please set the language in Model.objects.language() instead.',
-                                  DeprecationWarning, stacklevel=2)
-                if params['language_code'] == 'all':
-                    raise ValueError('Cannot create an object with language \'all\'')
-                obj = self.shared_model(**params)
-                # END PATCH
-                sid = transaction.savepoint(using=self.db)
-                obj.save(force_insert=True, using=self.db)
-                transaction.savepoint_commit(sid, using=self.db)
-                return obj, True
-            except IntegrityError:
-                transaction.savepoint_rollback(sid, using=self.db)
-                exc_info = sys.exc_info()
-                try:
-                    return self.get(**lookup), False
-                except self.model.DoesNotExist:
-                    # Re-raise the IntegrityError with its original traceback.
-                    raise exc_info[1]
+            return self._create_object_from_params(lookup, kwargs, defaults)
 
     @minimumDjangoVersion(1, 7)
     def update_or_create(self, defaults=None, **kwargs):
-        raise NotImplementedError()
+        """
+        Looks up an object with the given kwargs, updating one with defaults
+        if it exists, otherwise creates a new one.
+        The object is looked up in the queryset language, ignoring fallbacks.
+        If the shared object exists without a translation in that language,
+        the translation is created.
+        Only the shared and translated fields that actually change are saved.
+        Returns a tuple (object, created), where created is a boolean
+        specifying whether an object or translation was created.
+        """
+        if self._language_code == 'all':
+            raise ValueError('Cannot use update_or_create along with language(\'all\').')
+        defaults = defaults or {}
+        lookup = self._extract_lookup(kwargs)
+        qs = self._clone()
+        qs._language_fallbacks = None
+        qs._for_write = True
+        with transaction.atomic(using=self.db):
+            try:
+                obj = qs.get(**lookup)
+            except self.model.DoesNotExist:
+                obj = qs._get_untranslated_object(lookup)
+                if obj is not None:
+                    return qs._create_translation_from_params(obj, kwargs, defaults), True
+                obj, created = qs._create_object_from_params(lookup, kwargs, defaults)
+                if created:
+                    return obj, created
+
+            changed = self._split_kwargs(**dict(
+                (name, value) for name, value in defaults.items()
+                if getattr(obj, name) != value
+            ))
+            for fields in changed:
+                for name, value in fields.items():
+                    setattr(obj, name, value)
+            shared, translated = changed
+            opts = self.shared_model._meta
+            if shared:
+                # detach the translation so save_translations does not save it whole
+                trans = obj.__dict__.pop(opts.translations_cache)
+                try:
+                    auto_now = [field.name for field in opts.local_fields
+                                if getattr(field, 'auto_now', False)]
+                    obj.save(update_fields=list(shared) + auto_now, using=self.db)
+                finally:
+                    setattr(obj, opts.translations_cache, trans)
+            if translated:
+                trans = getattr(obj, opts.translations_cache)
+                trans.save(update_fields=list(translated), using=self.db)
+        return obj, False
+
+    def _get_untranslated_object(self, lookup):
+        """
+        Returns the shared instance matching lookup, if lookup only uses shared
+        fields. Returns None if there is none, or if lookup needs translations.
+        """
+        if not all(self._translate_fieldname(key).startswith('master__') for key in lookup):
+            return None
+        try:
+            return QuerySet(self.shared_model, using=self.db).get(**lookup)
+        except self.shared_model.DoesNotExist:
+            return None
+
+    def _create_translation_from_params(self, obj, kwargs, defaults):
+        """
+        Translates an existing shared instance in the queryset language, then
+        saves it along with the new translation. Used by update_or_create.
+        """
+        params = dict([(k, v) for k, v in kwargs.items() if '__' not in k])
+        params.update(defaults)
+        obj.translate(self._language_code or get_language())
+        for name, value in params.items():
+            setattr(obj, name, value)
+        obj.save(using=self.db)
+        return obj
+
+    def _extract_lookup(self, kwargs):
+        lookup = kwargs.copy()
+        for f in self.model._meta.fields:
+            if f.attname in lookup:
+                lookup[f.name] = lookup.pop(f.attname)
+        return lookup
+
+    def _create_object_from_params(self, lookup, kwargs, defaults):
+        """
+        Tries to create an object using passed params. Used by get_or_create
+        and update_or_create.
+        """
+        try:
+            params = dict([(k, v) for k, v in kwargs.items() if '__' not in k])
+            params.update(defaults)
+            # START PATCH
+            if 'language_code' not in params:
+                params['language_code'] = self._language_code or get_language()
+            else:
+                warnings.warn('Overriding language_code in get_or_create() is deprecated. '
+                              'Please set the language in Model.objects.language() instead.',
+                              DeprecationWarning, stacklevel=3)
+            if params['language_code'] == 'all':
+                raise ValueError('Cannot create an object with language \'all\'')
+            obj = self.shared_model(**params)
+            # END PATCH
+            sid = transaction.savepoint(using=self.db)
+            obj.save(force_insert=True, using=self.db)
+            transaction.savepoint_commit(sid, using=self.db)
+            return obj, True
+        except IntegrityError:
+            transaction.savepoint_rollback(sid, using=self.db)
+            exc_info = sys.exc_info()
+            try:
+                return self.get(**lookup), False
+            except self.model.DoesNotExist:
+                # Re-raise the IntegrityError with its original traceback.
+                raise exc_info[1]
 
     def bulk_create(self, objs, batch_size=None):
-        raise NotImplementedError()
+        """
+        Inserts the shared and translated parts of given instances. Like its
+        Django counterpart, it does not call save() nor send any signal.
+        Shared instances with a primary key are inserted by batches. Others
+        are inserted by batches on PostgreSQL, getting primary keys back using
+        INSERT ... RETURNING, and one by one on other databases, as Django
+        cannot get back primary keys from a bulk insert. Translations are then
+        inserted by batches, and their primary keys recovered using their
+        (master, language_code) uniqueness.
+        """
+        assert batch_size is None or batch_size > 0
+        if self.shared_model._meta.parents:
+            raise ValueError("Can't bulk create an inherited model")
+        if not objs:
+            return objs
+        tcache = self.shared_model._meta.translations_cache
+        with atomic(using=self.db):
+            with_pk = [obj for obj in objs if obj.pk is not None]
+            if with_pk:
+                self._plain_bulk_create(self.shared_model, with_pk, batch_size)
+            fields = [field for field in self.shared_model._meta.local_fields
+                      if not isinstance(field, models.AutoField)]
+            without_pk = [obj for obj in objs if obj.pk is None]
+            if without_pk and fields and connections[self.db].vendor == 'postgresql':
+                self._insert_returning_pks(without_pk, fields, batch_size)
+            else:
+                for obj in without_pk:
+                    obj.pk = self.shared_model._base_manager._insert(
+                        [obj], fields=fields, return_id=True, using=self.db)
+
+            translations = []
+            for obj in objs:
+                translation = getattr(obj, tcache, None)
+                if translation is not None:
+                    translation.master = obj
+                    translations.append(translation)
+            if translations:
+                self._plain_bulk_create(self.model, translations, batch_size)
+                self._recover_translation_pks(translations, batch_size or CHUNK_SIZE)
+        return objs
+
+    def _plain_bulk_create(self, model, objs, batch_size):
+        qs = QuerySet(model, using=self.db)
+        if django.VERSION >= (1, 5):
+            qs.bulk_create(objs, batch_size)
+        else:                           # Django 1.4 has no batch_size
+            qs.bulk_create(objs)
+
+    def _insert_returning_pks(self, objs, fields, batch_size):
+        """ Insert shared instances by batches, setting their primary keys from
+            the rows returned by INSERT ... RETURNING, which are in the same
+            order as the inserted values on PostgreSQL.
+        """
+        connection = connections[self.db]
+        qn = connection.ops.quote_name
+        opts = self.shared_model._meta
+        sql = 'INSERT INTO %s (%s) VALUES %%s RETURNING %s' % (
+            qn(opts.db_table), ', '.join(qn(field.column) for field in fields),
+            qn(opts.pk.column))
+        placeholder = '(%s)' % ', '.join(['%s'] * len(fields))
+        batch_size = min(batch_size or len(objs), bulk_batch_size(connection, len(fields), objs))
+        cursor = connection.cursor()
+        for index in range(0, len(objs), batch_size):
+            batch = objs[index:index + batch_size]
+            params = [field.get_db_prep_save(field.pre_save(obj, True), connection=connection)
+                      for obj in batch for field in fields]
+            cursor.execute(sql % ', '.join([placeholder] * len(batch)), params)
+            for obj, row in zip(batch, cursor.fetchall()):
+                obj.pk = row[0]
+
+    def _recover_translation_pks(self, translations, batch_size):
+        # Each translation uses up to one parameter for its master, one for its language
+        batch_size = min(batch_size, bulk_batch_size(connections[self.db], 2, translations))
+        for index in range(0, len(translations), batch_size):
+            batch = dict(((trans.master_id, trans.language_code), trans)
+                         for trans in translations[index:index + batch_size])
+            qs = QuerySet(self.model, using=self.db).filter(
+                master__in=set(key[0] for key in batch),
+                language_code__in=set(key[1] for key in batch),
+            ).values_list('pk', 'master', 'language_code')
+            for pk, master_id, language_code in qs:
+                try:
+                    batch[(master_id, language_code)].pk = pk
+                except KeyError:
+                    pass
 
     def aggregate(self, *args, **kwargs):
         """
         Loops over all the passed aggregates and translates the fieldnames
         """
-        qs = self._clone()._add_language_filter()
+        qs = self._for_query()
         newargs, newkwargs = [], {}
         for arg in args:
             arg.lookup = qs._translate_fieldnames([arg.lookup])[0]
@@ -621,14 +1378,44 @@ class TranslationQueryset(QuerySet):
         field_name = self.field_translator(field_name or self.shared_model._meta.get_latest_by)
         return super(TranslationQueryset, self).earliest(field_name)
 
-    def in_bulk(self, id_list):
+    def in_bulk(self, id_list, languages=None):
+        """
+        Returns a dictionary mapping each id to the object with that id.
+        If languages are given, the queryset language is ignored and the
+        dictionary maps each id to a dictionary of objects by language code
+        instead, for all given languages the object is translated in. An empty
+        list loads all translations.
+        """
         if not id_list:
             return {}
-        if self._language_code == 'all':
-            raise ValueError('Cannot use in_bulk along with language(\'all\').')
-        qs = self.filter(pk__in=id_list)
+        if languages is None:
+            if self._language_code == 'all':
+                raise ValueError('Cannot use in_bulk along with language(\'all\').')
+            qs = self.filter(pk__in=id_list)
+            qs.query.clear_ordering(force_empty=True)
+            qs._single_use = True
+            return dict((obj._get_pk_val(), obj) for obj in qs.iterator())
+
+        languages = _unique_languages(get_language() if lang is None else lang
+                                      for lang in languages)
+        id_list = list(id_list)
+        qs = self._clone()
+        qs._language_code = 'all'
+        qs._language_fallbacks = None
+        if languages:
+            qs = qs.filter(language_code__in=languages)
         qs.query.clear_ordering(force_empty=True)
-        return dict((obj._get_pk_val(), obj) for obj in qs.iterator())
+
+        # Each query uses one parameter per id, plus one per language
+        connection = connections[self.db]
+        batch_size = bulk_batch_size(connection, 1, id_list, reserved=len(languages))
+        result = {}
+        for index in range(0, len(id_list), batch_size):
+            batch_qs = qs.filter(pk__in=id_list[index:index + batch_size])
+            batch_qs._single_use = True
+            for obj in batch_qs.iterator():
+                result.setdefault(obj._get_pk_val(), {})[obj.language_code] = obj
+        return result
 
     def delete(self):
         qs = self._get_shared_queryset()
@@ -642,7 +1429,7 @@ class TranslationQueryset(QuerySet):
     delete_translations.alters_data = True
 
     def update(self, **kwargs):
-        qs = self._clone()._add_language_filter()
+        qs = self._for_query()
         shared, translated = qs._split_kwargs(**kwargs)
         count = 0
         if translated:
@@ -653,6 +1440,82 @@ class TranslationQueryset(QuerySet):
         return count
     update.alters_data = True
 
+    def bulk_update_translations(self, values, batch_size=None):
+        """
+        Sets translated fields of many instances in the queryset's language.
+        'values' maps primary keys of shared instances to dictionaries of
+        translated field values. Missing translations are inserted, existing
+        ones are updated. Shared instances are neither checked nor saved.
+        Returns a tuple (created, updated) with translation counts.
+        """
+        assert batch_size is None or batch_size > 0
+        language_code = self._language_code or get_language()
+        if language_code == 'all':
+            raise ValueError('Cannot update translations with language \'all\'')
+        opts = self.model._meta
+        protected = ('master', 'language_code', opts.pk.name)
+        names = set(name for fields in values.values() for name in fields)
+        for name in names:
+            if name in protected:
+                raise ValueError('Field %r cannot be set by bulk_update_translations' % name)
+            opts.get_field(name)  # raises FieldDoesNotExist
+
+        created = updated = 0
+        pks = [pk for pk, fields in values.items() if fields]
+        connection = connections[self.db]
+        # Updates use up to two parameters per field, plus one, for each row,
+        # and one for the language
+        max_size = bulk_batch_size(connection, 2 * len(names) + 1, pks, reserved=1)
+        batch_size = max(min(batch_size or CHUNK_SIZE, max_size), 1)
+        with atomic(using=self.db):
+            for index in range(0, len(pks), batch_size):
+                batch = pks[index:index + batch_size]
+                existing = set(QuerySet(self.model, using=self.db)
+                                   .filter(master__in=batch, language_code=language_code)
+                                   .values_list('master', flat=True))
+                new = [self.model(master_id=pk, language_code=language_code, **values[pk])
+                       for pk in batch if pk not in existing]
+                if new:
+                    QuerySet(self.model, using=self.db).bulk_create(new)
+                    created += len(new)
+                if existing:
+                    self._update_translations_batch(
+                        connection, language_code,
+                        dict((pk, values[pk]) for pk in batch if pk in existing))
+                    updated += len(existing)
+        return created, updated
+    bulk_update_translations.alters_data = True
+
+    def _update_translations_batch(self, connection, language_code, values):
+        """
+        Updates translations of a batch of shared instances in a single
+        statement, using a CASE expression for each field.
+        """
+        opts = self.model._meta
+        qn = connection.ops.quote_name
+        master = qn(opts.get_field('master').column)
+        assignments, params = [], []
+        for name in set(name for fields in values.values() for name in fields):
+            field = opts.get_field(name)
+            cases = []
+            for pk, fields in values.items():
+                if name not in fields:
+                    continue
+                value = fields[name]
+                if hasattr(value, 'prepare_database_save'):
+                    value = value.prepare_database_save(field)
+                cases.append('WHEN %s THEN %s')
+                params.extend((pk, field.get_db_prep_save(value, connection=connection)))
+            assignments.append('%s = CASE %s %s ELSE %s END' % (
+                qn(field.column), master, ' '.join(cases), qn(field.column)))
+        params.append(language_code)
+        params.extend(values.keys())
+        sql = 'UPDATE %s SET %s WHERE %s = %%s AND %s IN (%s)' % (
+            qn(opts.db_table), ', '.join(assignments),
+            qn(opts.get_field('language_code').column), master,
+            ', '.join(['%s'] * len(values)))
+        connection.cursor().execute(sql, params)
+
     #===========================================================================
     # Queryset/Manager API that return another queryset
     #===========================================================================
@@ -687,6 +1550,18 @@ class TranslationQueryset(QuerySet):
         fields = self._translate_fieldnames(fields)
         return super(TranslationQueryset, self).values_list(*fields, **kwargs)
 
+    def named(self, *fields):
+        if not fields:
+            trans_opts = self.model._meta
+            fields = tuple(field.name for field in chain(
+                self.shared_model._meta.fields,
+                (field for field in trans_opts.fields
+                 if field.name != 'master' and not field is trans_opts.pk)
+            ))
+        return self._clone(klass=NamedValuesListQuerySet, setup=True, flat=False,
+                           _fields=self._translate_fieldnames(fields),
+                           _named_fields=tuple(fields), _row_model=self.shared_model)
+
     def dates(self, field_name, kind=None, order='ASC'):
         field_name = self.field_translator(field_name)
         return super(TranslationQueryset, self).dates(field_name, kind=kind, order=order)
@@ -701,11 +1576,11 @@ class TranslationQueryset(QuerySet):
             raise NotImplementedError('To use select_related on a translated model, '
                                       'you must provide a list of fields.')
         if fields == (None,):
-            self._raw_select_related = []
+            self._raw_select_related = ()
         elif django.VERSION >= (1, 7):  # in newer versions, calls are cumulative
-            self._raw_select_related.extend(fields)
+            self._raw_select_related += fields
         else:                           # in older versions, they overwrite each other
-            self._raw_select_related = list(fields)
+            self._raw_select_related = fields
         return self
 
     def complex_filter(self, filter_obj):
@@ -718,7 +1593,23 @@ class TranslationQueryset(QuerySet):
         return super(TranslationQueryset, self)._filter_or_exclude(None, *newargs, **newkwargs)
 
     def annotate(self, *args, **kwargs):
-        raise NotImplementedError()
+        """
+        Translates the fieldnames of all passed aggregates. Annotations are named
+        after the untranslated fieldnames, and set on the shared instance.
+        """
+        for arg in args:
+            if arg.default_alias in kwargs:
+                raise ValueError("The named annotation '%s' conflicts with the "
+                                 "default name for another annotation."
+                                 % arg.default_alias)
+            kwargs[arg.default_alias] = arg
+        for value in kwargs.values():
+            value.lookup = self._translate_fieldname(value.lookup)
+        qs = super(TranslationQueryset, self).annotate(**kwargs)
+        switch_fields = set(self._hvad_switch_fields)
+        switch_fields.update(kwargs.keys())
+        qs._hvad_switch_fields = tuple(switch_fields)
+        return qs
 
     def order_by(self, *field_names):
         """
@@ -731,25 +1622,60 @@ class TranslationQueryset(QuerySet):
         return super(TranslationQueryset, self).reverse()
 
     def defer(self, *fields):
-        raise NotImplementedError()
+        if fields == (None,):
+            return super(TranslationQueryset, self).defer(None)
+        # master and language_code are required to build the instances
+        fieldnames = [name for name in self._translate_fieldnames(fields)
+                      if name not in self._required_field_names]
+        return super(TranslationQueryset, self).defer(*fieldnames)
 
     def only(self, *fields):
-        raise NotImplementedError()
+        fieldnames = self._translate_fieldnames(fields)
+        # master and language_code are required to build the instances
+        fieldnames.extend(name for name in self._required_field_names
+                          if name not in fieldnames)
+        return super(TranslationQueryset, self).only(*fieldnames)
 
 #===============================================================================
 # Fallbacks
 #===============================================================================
 
-class _SharedFallbackQueryset(QuerySet):
+class _SharedFallbackQueryset(LoadingOptionsMixin, QuerySet):
     translation_fallbacks = None
+    _batch_translations = False
+    _prefetch_languages = None
+    _fallback_strategy = None
+    _memoize_count = False
+    _count_cache = None
 
     def use_fallbacks(self, *fallbacks):
         self.translation_fallbacks = fallbacks or (None,)+FALLBACK_LANGUAGES
         return self
 
+    def batch_translations(self, enabled=True):
+        self._batch_translations = enabled
+        return self
+
+    def count(self):
+        if self._result_cache is None and self._count_cache is not None:
+            return self._count_cache
+        count = super(_SharedFallbackQueryset, self).count()
+        if self._result_cache is None and self._memoize_count:
+            self._count_cache = count
+        return count
+
+    def named(self, *fields):
+        fields = tuple(fields or (field.name for field in self.model._meta.fields))
+        return self._clone(klass=NamedValuesListQuerySet, setup=True, flat=False,
+                           _fields=fields, _named_fields=fields, _row_model=self.model)
+
     def _clone(self, klass=None, setup=False, **kwargs):
         kwargs.update({
             'translation_fallbacks': self.translation_fallbacks,
+            '_prefetch_languages': self._prefetch_languages,
+            '_fallback_strategy': self._fallback_strategy,
+            '_memoize_count': self._memoize_count,
+            '_batch_translations': self._batch_translations,
         })
         return super(_SharedFallbackQueryset, self)._clone(klass, setup, **kwargs)
 
@@ -814,6 +1740,7 @@ class LegacyFallbackQueryset(_SharedFallbackQueryset):
                                str(instance.pk)))
                 yield instance
 
+    @loading_translations
     def iterator(self):
         """
         The logic for this method was taken from django-polymorphic by Bert
@@ -854,17 +1781,103 @@ class LegacyFallbackQueryset(_SharedFallbackQueryset):
                 yield instance
 
 class SelfJoinFallbackQueryset(_SharedFallbackQueryset):
+    def _join_translations(self):
+        """ Left join the translations table, returning its alias """
+        tmodel = self.model._meta.translations_model
+        taccessor = self.model._meta.translations_accessor
+        masteratt = tmodel._meta.get_field('master').attname
+        nullable = ({'nullable': True} if django.VERSION >= (1, 7) else
+                    {'nullable': True, 'outer_if_first': True})
+        return self.query.join((self.query.get_initial_alias(), tmodel._meta.db_table,
+                                ((self.model._meta.pk.attname, masteratt),)),
+                               join_field=getattr(self.model, taccessor).related.field.rel,
+                               **nullable)
+
+    def _add_fallbacks_filter(self, alias1):
+        """ Restrict translations joined as alias1 to the best one, if any """
+        fallbacks = [get_language() if lang is None else lang
+                     for lang in self.translation_fallbacks]
+        tmodel = self.model._meta.translations_model
+        masteratt = tmodel._meta.get_field('master').attname
+        connection = connections[self.db]
+        if use_window_fallbacks(self._fallback_strategy, connection):
+            ranking = WindowFallbackRanking(tmodel, fallbacks)
+            sql, params = ranking.get_extra_where(connection, alias1)
+            self.query.add_extra(None, None, ('%s.id IS NULL OR %s' % (alias1, sql),),
+                                 params, None, None)
+        else:
+            nullable = ({'nullable': True} if django.VERSION >= (1, 7) else
+                        {'nullable': True, 'outer_if_first': True})
+            alias2 = self.query.join((tmodel._meta.db_table, tmodel._meta.db_table,
+                                      ((masteratt, masteratt),)),
+                                     join_field=BetterTranslationsField(fallbacks),
+                                     **nullable)
+            self.query.add_extra(None, None, ('%s.id IS NULL'%alias2,), None, None, None)
+
+    def _fallback_fields(self, attname=False):
+        """ Names of all shared and translated fields, used when no field is
+            given to values(), values_list() or named()
+        """
+        opts = self.model._meta
+        trans_opts = opts.translations_model._meta
+        fields = chain(opts.concrete_fields,
+                       (field for field in trans_opts.concrete_fields
+                        if field.name != 'master' and not field is trans_opts.pk))
+        return tuple(field.attname if attname else field.name for field in fields)
+
+    def _fallback_values(self, klass, fields, **kwargs):
+        """ Clone into a values queryset of given class, translated fields
+            being read from the translations join, that is restricted to the
+            best translation when the queryset is evaluated
+        """
+        opts = self.model._meta
+        routing = opts.translations_routing
+        lookups = []
+        for name in fields:
+            root = name.split('__', 1)[0]
+            if root in routing.translated and not root in routing.shared:
+                name = '%s__%s' % (opts.translations_accessor, name)
+            lookups.append(name)
+
+        # Join translations first, so values() reuses the join
+        qs = self._clone()
+        alias = qs._join_translations()
+        return qs._clone(klass=klass, setup=True, _fields=tuple(lookups),
+                         _translations_alias=alias, **kwargs)
+
+    def values(self, *fields):
+        if not self.translation_fallbacks:
+            return super(SelfJoinFallbackQueryset, self).values(*fields)
+        return self._fallback_values(FallbackValuesQuerySet,
+                                     fields or self._fallback_fields(attname=True))
+
+    def values_list(self, *fields, **kwargs):
+        if not self.translation_fallbacks:
+            return super(SelfJoinFallbackQueryset, self).values_list(*fields, **kwargs)
+        flat = kwargs.pop('flat', False)
+        if kwargs:
+            raise TypeError('Unexpected keyword arguments to values_list: %s'
+                            % (list(kwargs),))
+        if flat and len(fields) > 1:
+            raise TypeError("'flat' is not valid when values_list is called with more than one field.")
+        return self._fallback_values(FallbackValuesListQuerySet,
+                                     fields or self._fallback_fields(attname=True),
+                                     flat=flat)
+
+    def named(self, *fields):
+        if not self.translation_fallbacks:
+            return super(SelfJoinFallbackQueryset, self).named(*fields)
+        fields = tuple(fields or self._fallback_fields())
+        return self._fallback_values(FallbackNamedValuesListQuerySet, fields, flat=False,
+                                     _named_fields=fields, _row_model=self.model)
+
+    @loading_translations
     def iterator(self):
         # only do special stuff when we actually want fallbacks
         if self.translation_fallbacks:
-            fallbacks = [get_language() if lang is None else lang
-                         for lang in self.translation_fallbacks]
-            tmodel = self.model._meta.translations_model
             taccessor = self.model._meta.translations_accessor
             taccessorcache = getattr(self.model, taccessor).related.get_cache_name()
             tcache = self.model._meta.translations_cache
-            masteratt = tmodel._meta.get_field('master').attname
-            field = BetterTranslationsField(fallbacks)
 
             qs = self._clone()
 
@@ -872,22 +1885,13 @@ class SelfJoinFallbackQueryset(_SharedFallbackQueryset):
             # This join will be reused by the select_related. We must provide it
             # anyway because the order matters and add_select_related does not
             # populate joins right away.
-            nullable = ({'nullable': True} if django.VERSION >= (1, 7) else
-                        {'nullable': True, 'outer_if_first': True})
-            alias1 = qs.query.join((qs.query.get_initial_alias(), tmodel._meta.db_table,
-                                    ((qs.model._meta.pk.attname, masteratt),)),
-                                   join_field=getattr(qs.model, taccessor).related.field.rel,
-                                   **nullable)
-            alias2 = qs.query.join((tmodel._meta.db_table, tmodel._meta.db_table,
-                                    ((masteratt, masteratt),)),
-                                   join_field=field, **nullable)
-            qs.query.add_extra(None, None, ('%s.id IS NULL'%alias2,), None, None, None)
+            qs._add_fallbacks_filter(qs._join_translations())
 
             # We must force the _unique field so get_cached_row populates the cache
-            # Unfortunately, this means we must load everything in one go
-            getattr(qs.model, taccessor).related.field._unique = True
-            objects = []
-            for instance in super(SelfJoinFallbackQueryset, qs).iterator():
+            # It is only needed until the first row is fetched, then rows are streamed
+            objects = forced_unique_iterator(super(SelfJoinFallbackQueryset, qs).iterator(),
+                                             (getattr(qs.model, taccessor).related.field,))
+            for instance in objects:
                 try:
                     translation = getattr(instance, taccessorcache)
                 except AttributeError:
@@ -898,15 +1902,83 @@ class SelfJoinFallbackQueryset(_SharedFallbackQueryset):
                 else:
                     setattr(instance, tcache, translation)
                     delattr(instance, taccessorcache)
-                objects.append(instance)
-            getattr(qs.model, taccessor).related.field._unique = False
-            return iter(objects)
+                yield instance
         else:
-            return super(SelfJoinFallbackQueryset, self).iterator()
+            # just iterate over it
+            for instance in super(SelfJoinFallbackQueryset, self).iterator():
+                yield instance
+
+
+class FallbackValuesMixin(object):
+    """ Values of a SelfJoinFallbackQueryset, the fallbacks filter being
+        applied on the translations join when the queryset is evaluated.
+    """
+    def _fallbacks_clone(self):
+        qs = self._clone()
+        qs._add_fallbacks_filter(qs._translations_alias)
+        return qs
+
+    def iterator(self):
+        return super(FallbackValuesMixin, self._fallbacks_clone()).iterator()
+
+    def count(self):
+        if self._result_cache is not None or self._count_cache is not None:
+            return super(FallbackValuesMixin, self).count()
+        # translations join would duplicate rows if counted unfiltered
+        count = super(FallbackValuesMixin, self._fallbacks_clone()).count()
+        if self._memoize_count:
+            self._count_cache = count
+        return count
+
+    def _clone(self, *args, **kwargs):
+        clone = super(FallbackValuesMixin, self)._clone(*args, **kwargs)
+        if not hasattr(clone, '_translations_alias'):
+            clone._translations_alias = self._translations_alias
+        return clone
+
+
+class FallbackValuesQuerySet(FallbackValuesMixin, ValuesQuerySet, SelfJoinFallbackQueryset):
+    """ Dictionaries of a SelfJoinFallbackQueryset, keyed by the given field
+        names rather than by the lookups through the translations join.
+    """
+    def iterator(self):
+        prefix = '%s__' % self.model._meta.translations_accessor
+        renames = [(name, name[len(prefix):]) for name in self.field_names
+                   if name.startswith(prefix)]
+        for row in super(FallbackValuesQuerySet, self).iterator():
+            for lookup, name in renames:
+                row[name] = row.pop(lookup)
+            yield row
+
+
+class FallbackValuesListQuerySet(FallbackValuesMixin, ValuesListQuerySet, SelfJoinFallbackQueryset):
+    """ Tuples of a SelfJoinFallbackQueryset """
+
+
+class FallbackNamedValuesListQuerySet(FallbackValuesMixin, NamedValuesListQuerySet,
+                                      SelfJoinFallbackQueryset):
+    """ Records of a SelfJoinFallbackQueryset """
 
 
 FallbackQueryset = LegacyFallbackQueryset if LEGACY_FALLBACKS else SelfJoinFallbackQueryset
 
+#===============================================================================
+# Default queryset
+#===============================================================================
+
+class BatchQueryset(QuerySet):
+    """
+    Regular, translation-unaware queryset. The only difference is that the
+    instances it returns share a TranslationsBatch, so the first access to a
+    translated field loads the translations of all of them at once.
+    Use it as TranslationManager's default_class to enable this behavior.
+    """
+    _batch_translations = True
+
+    @loading_translations
+    def iterator(self):
+        return super(BatchQueryset, self).iterator()
+
 
 class TranslationFallbackManager(models.Manager):
     """
@@ -1022,11 +2094,11 @@ class TranslationAwareQueryset(QuerySet):
             (self._translate(key, self.model, language_joins), value)
             for key, value in kwargs.items()
         )
-        newargs = deepcopy(args)
-        for q in newargs:
-            for child, children, index in q_children(q):
-                children[index] = (self._translate(child[0], self.model, language_joins),
-                                   child[1])
+        newargs = tuple(
+            q_rewrite(q, (self._translate(key, self.model, language_joins)
+                          for key in q_keys(q)))
+            for q in args
+        )
         for langjoin in language_joins:
             extra_filters &= Q(**{langjoin: self._language_code})
         return newargs, newkwargs, extra_filters
@@ -2,15 +2,17 @@ from django.core.exceptions import ImproperlyConfigured
 from django.conf import settings
 from django.db import models
 from django.db.models.base import ModelBase
-from django.db.models.fields import FieldDoesNotExist
 from django.db.models.manager import Manager
 from django.db.models.signals import post_save, class_prepared
 from django.utils.translation import get_language
 from hvad.descriptors import LanguageCodeAttribute, TranslatedAttribute
-from hvad.manager import TranslationManager, TranslationsModelManager
-from hvad.utils import SmartGetFieldByName
+from hvad.manager import (FieldTranslator, TranslationManager,
+                          TranslationsModelManager, make_unique_forceable)
+from hvad.utils import (SmartGetFieldByName, get_translation,
+                         set_cached_translation)
 from hvad.compat.method_type import MethodType
 from hvad.compat.settings import settings_updater
+from itertools import chain
 import sys
 import warnings
 
@@ -90,8 +92,10 @@ def create_translations_model(model, related_name, meta, **fields):
         attrs['objects'] = TranslationsModelManager()
         attrs['language_code'] = models.CharField(max_length=15, db_index=True)
         # null=True is so we can prevent cascade deletion
-        attrs['master'] = models.ForeignKey(model, related_name=related_name,
-                                            editable=False, null=True)
+        # forceable uniqueness is so select_related can follow translations
+        attrs['master'] = make_unique_forceable(
+            models.ForeignKey(model, related_name=related_name, editable=False, null=True)
+        )
     # Create and return the new model
     translations_model = ModelBase(name, tuple(translation_bases), attrs)
     if not abstract:
@@ -167,16 +171,17 @@ class TranslatableModel(models.Model):
         tkwargs = {} # translated fields
         skwargs = {} # shared fields
         
-        if 'master' in kwargs.keys():
+        if 'master' in kwargs:
             raise RuntimeError(
                     "Cannot init  %s class with a 'master' argument" % \
                     self.__class__.__name__
             )
         
         # filter out all the translated fields (including 'master' and 'language_code')
+        routing = self._meta.translations_routing
         primary_key_names = ('pk', self._meta.pk.name)
         for key in list(kwargs.keys()):
-            if key in self._translated_field_names:
+            if key in routing.translated:
                 if not key in primary_key_names:
                     # we exclude the pk of the shared model
                     tkwargs[key] = kwargs.pop(key)
@@ -190,7 +195,7 @@ class TranslatableModel(models.Model):
         # in kwargs. We need to do magic.
         # extract all the shared fields (including the pk)
         for key in list(kwargs.keys()):
-            if key in self._shared_field_names:
+            if key in routing.shared:
                 skwargs[key] = kwargs.pop(key)
         # do the regular init minus the translated fields
         super(TranslatableModel, self).__init__(*args, **skwargs)
@@ -211,21 +216,51 @@ class TranslatableModel(models.Model):
             if not trans.master_id:
                 trans.master = instance
             trans.save()
+        loaded = getattr(instance, opts.translations_loaded, None)
+        if loaded is not None:
+            # translations known to be missing might have been created since
+            for code in [code for code, value in loaded.items() if value is None]:
+                del loaded[code]
+            if hasattr(instance, opts.translations_cache):
+                loaded[trans.language_code] = trans
     
     def translate(self, language_code):
         """
         Returns an Model instance in the specified language.
-        Does NOT check if the translation already exists!
+        Reuses the translation if it was already loaded on the instance,
+        otherwise creates a new one.
+        Does NOT check if the translation already exists in the database!
         Does NOT interact with the database.
         
         This will refresh the translations cache attribute on the instance.
         """
-        tkwargs = {
-            'language_code': language_code,
-            'master': self,
-        }
-        translated = self._meta.translations_model(**tkwargs)
-        setattr(self, self._meta.translations_cache, translated)
+        loaded = getattr(self, self._meta.translations_loaded, None) or {}
+        translated = loaded.get(language_code)
+        if translated is None:
+            cached = getattr(self, self._meta.translations_cache, None)
+            if cached is not None and cached.language_code == language_code:
+                translated = cached
+            else:
+                translated = self._meta.translations_model(language_code=language_code,
+                                                           master=self)
+        set_cached_translation(self, translated)
+        return self
+
+    def switch_translation(self, language_code=None):
+        """
+        Makes the translation in the specified language, or current language
+        if None, the active one on this instance.
+        Uses translations already loaded on the instance if possible, loading
+        it from the database otherwise.
+
+        Raises the translations model's DoesNotExist if there is no such
+        translation.
+        """
+        cached = getattr(self, self._meta.translations_cache, None)
+        if language_code is None:
+            language_code = get_language()
+        if cached is None or cached.language_code != language_code:
+            set_cached_translation(self, get_translation(self, language_code))
         return self
     
     def safe_translation_getter(self, name, default=None):
@@ -264,7 +299,7 @@ class TranslatableModel(models.Model):
             # none of the fallbacks was found, pick an arbitrary translation
             translation = translation_dict.popitem()[1]
 
-        setattr(self, self._meta.translations_cache, translation)
+        set_cached_translation(self, translation)
         return getattr(translation, name, default)
 
     def get_available_languages(self):
@@ -280,32 +315,54 @@ class TranslatableModel(models.Model):
     
     @property
     def _shared_field_names(self):
-        if getattr(self, '_shared_field_names_cache', None) is None:
-            opts = self._meta
-            self._shared_field_names_cache = opts.get_all_field_names()
-            for name in tuple(self._shared_field_names_cache):
-                try:
-                    attname = opts.get_field(name).get_attname()
-                except FieldDoesNotExist:
-                    pass
-                else:
-                    if attname and attname != name:
-                        self._shared_field_names_cache.append(attname)
-        return self._shared_field_names_cache
+        return self._meta.translations_routing.shared
     @property
     def _translated_field_names(self):
-        if getattr(self, '_translated_field_names_cache', None) is None:
-            opts = self._meta.translations_model._meta
-            self._translated_field_names_cache = opts.get_all_field_names()
-            for name in tuple(self._translated_field_names_cache):
-                try:
-                    attname = opts.get_field(name).get_attname()
-                except FieldDoesNotExist:
-                    pass
-                else:
-                    if attname and attname != name:
-                        self._translated_field_names_cache.append(attname)
-        return self._translated_field_names_cache
+        return self._meta.translations_routing.translated
+
+
+class FieldRouting(object):
+    """
+    Field name tables of a translatable model, created by
+    prepare_translatable_model and shared by instances and querysets.
+    - shared: names and attnames of fields on the shared model.
+    - translated: names and attnames of fields on the translations model.
+    Both include reverse relations, that are only known once all models are
+    loaded, so tables and the field translator are built on first use.
+    """
+    def __init__(self, model):
+        self.model = model
+        self._shared = None
+        self._translated = None
+        self._field_translator = None
+
+    @property
+    def shared(self):
+        if self._shared is None:
+            self._shared = self._field_names(self.model._meta)
+        return self._shared
+
+    @property
+    def translated(self):
+        if self._translated is None:
+            self._translated = self._field_names(self.model._meta.translations_model._meta)
+        return self._translated
+
+    @staticmethod
+    def _field_names(opts):
+        names = set(opts.get_all_field_names())
+        for field in chain(opts.fields, opts.many_to_many, opts.virtual_fields):
+            names.add(field.name)
+            attname = getattr(field, 'attname', None)
+            if attname:
+                names.add(attname)
+        return frozenset(names)
+
+    @property
+    def field_translator(self):
+        if self._field_translator is None:
+            self._field_translator = FieldTranslator(self.model)
+        return self._field_translator
 
 
 
@@ -320,6 +377,9 @@ def contribute_translations(cls, rel):
     opts.translations_accessor = rel.get_accessor_name()
     opts.translations_model = rel.model
     opts.translations_cache = '%s_cache' % rel.get_accessor_name()
+    opts.translations_loaded = '%s_loaded' % rel.get_accessor_name()
+    opts.translations_batch = '%s_batch' % rel.get_accessor_name()
+    opts.translations_routing = FieldRouting(cls)
     trans_opts = opts.translations_model._meta
 
     # Set descriptors
@@ -1,3 +1,4 @@
+from copy import copy
 import django
 from django.db.models import Q
 from django.db.models.expressions import ExpressionNode
@@ -22,6 +23,43 @@ def q_children(q):
                 yield child, q.children, index
 
 
+def q_keys(q):
+    ''' Recursively visit a Q object, yielding each lookup key in turn.
+        - q: the Q object to visit
+        - Keys are yielded depth-first, in the order they appear in the Q object
+    '''
+    for child in q.children:
+        if isinstance(child, Q):
+            for key in q_keys(child):
+                yield key
+        else:
+            yield child[0]
+
+
+def q_rewrite(q, keys):
+    ''' Rebuild a Q object with new lookup keys, leaving the original untouched.
+        - q: the Q object to rewrite
+        - keys: an iterator yielding the new keys, in the order of q_keys
+        - Returns a new Q object, sharing the nodes whose keys did not change
+          with the original one, or the original if no key changed.
+    '''
+    changed = False
+    children = []
+    for child in q.children:
+        if isinstance(child, Q):
+            newchild = q_rewrite(child, keys)
+        else:
+            key = next(keys)
+            newchild = child if key == child[0] else (key,) + tuple(child[1:])
+        changed = changed or newchild is not child
+        children.append(newchild)
+    if not changed:
+        return q
+    result = copy(q)
+    result.children = children
+    return result
+
+
 def expression_children(expression):
     ''' Recursively visit an expression object, yielding each child in turn.
         - expression: the expression object to visit
@@ -53,3 +91,25 @@ def where_node_children(node):
                 yield child, field_name
             if isinstance(child, WhereNode):
                 todo.append(child)
+
+
+def where_node_aliases(node):
+    ''' Recursively visit all children of a where node, yielding the table alias
+        each constraint applies to.
+        - node: the node to visit
+        - Yields None for constraints whose alias cannot be determined, such
+          as extra where clauses.
+    '''
+    todo = [node]
+    get_alias = ((lambda n: n.lhs.alias) if django.VERSION >= (1, 7) else
+                 (lambda n: n[0].alias))
+    while todo:
+        node = todo.pop()
+        for child in node.children:
+            if isinstance(child, WhereNode):
+                todo.append(child)
+                continue
+            try:
+                yield get_alias(child)
+            except (TypeError, AttributeError, IndexError):
+                yield None
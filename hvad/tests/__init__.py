@@ -6,22 +6,30 @@ if django.VERSION < (1, 6): # Starting from django 1.6 we use DiscoverRunner ins
                                   AdminRelationTests, TranslatableInlineAdminTests)
     from hvad.tests.basic import (OptionsTest, BasicQueryTest, AlternateCreateTest,
                                   CreateTest, GetTest, TranslatedTest,
+                                  SwitchTranslationTest,
                                   DeleteLanguageCodeTest, GetByLanguageTest,
                                   GetAllLanguagesTest, DescriptorTests,
                                   DefinitionTests, TableNameTest, GetOrCreateTest,
+                                  UpdateOrCreateTest,
                                   BooleanTests)
+    from hvad.tests.benchmark import (RoutingBenchmarkTests, IterBenchmarkTests,
+                                      FallbackBenchmarkTests)
     from hvad.tests.dates import LatestTests, DatesTests
     from hvad.tests.docs import DocumentationTests
     from hvad.tests.fallbacks import (FallbackTests, FallbackFilterTests, FallbackCachingTests,
-                                      FallbackIterTests, FallbackValuesListTests,
-                                      FallbackValuesTests, FallbackInBulkTests,
+                                      FallbackIterTests, FallbackPrefetchTranslationsTests,
+                                      FallbackValuesListTests,
+                                      FallbackValuesTests, FallbackNamedTests, FallbackInBulkTests,
+                                      FallbackSQLTests, WindowFallbackTests,
                                       FallbackNotImplementedTests)
     from hvad.tests.fieldtranslator import FieldtranslatorTests
     from hvad.tests.forms import FormTests
     from hvad.tests.ordering import OrderingTest, DefaultOrderingTest
-    from hvad.tests.query import (FilterTests, ExtraTests, QueryCachingTests, IterTests, UpdateTests,
-        ValuesListTests, ValuesTests, InBulkTests, DeleteTests, GetTranslationFromInstanceTests,
-        AggregateTests, NotImplementedTests, ExcludeTests, ComplexFilterTests,
+    from hvad.tests.query import (FilterTests, ExtraTests, QueryCachingTests, IterTests,
+        PrefetchTranslationsTests, BatchLoadingTests, UpdateTests,
+        ValuesListTests, ValuesTests, NamedTests, InBulkTests, DeleteTests, GetTranslationFromInstanceTests,
+        AggregateTests, AnnotateTests, BulkCreateTests, BulkUpdateTranslationsTests,
+        DeferTests, NotImplementedTests, ExcludeTests, LookupCacheTests, CountTests, ComplexFilterTests,
         MinimumVersionTests)
     from hvad.tests.related import (NormalToNormalFKTest, StandardToTransFKTest,
         TripleRelationTests, ManyToManyTest, ForwardDeclaringForeignKeyTests,
@@ -64,6 +64,18 @@ class OptionsTest(HvadTestCase):
         relmodel = Normal._meta.get_field_by_name(opts.translations_accessor)[0].model
         self.assertEqual(relmodel, opts.translations_model)
 
+    def test_routing(self):
+        routing = Related._meta.translations_routing
+        self.assertTrue(set(['id', 'normal', 'normal_id']) <= routing.shared)
+        self.assertTrue(set(['master', 'master_id', 'language_code', 'translated',
+                             'translated_id']) <= routing.translated)
+        self.assertFalse(routing.shared & set(['translated', 'translated_id',
+                                               'language_code']))
+        # reverse relations
+        self.assertIn('rel1', Normal._meta.translations_routing.shared)
+        self.assertIs(Related.objects.language('en').field_translator,
+                      Related.objects.language('ja').field_translator)
+
 
 class AlternateCreateTest(HvadTestCase):
     def test_create_instance_simple(self):
@@ -225,6 +237,58 @@ class TranslatedTest(HvadTestCase, NormalFixture):
             self.assertEqual(obj.translated_field, NORMAL[1].translated_field['ja'])
 
 
+class SwitchTranslationTest(HvadTestCase, NormalFixture):
+    normal_count = 1
+
+    def test_switch_translation(self):
+        obj = Normal.objects.language('en').get(pk=self.normal_id[1])
+        with self.assertNumQueries(1):
+            self.assertIs(obj.switch_translation('ja'), obj)
+        with self.assertNumQueries(0):
+            self.assertEqual(obj.language_code, 'ja')
+            self.assertEqual(obj.translated_field, NORMAL[1].translated_field['ja'])
+            obj.switch_translation('en')
+            self.assertEqual(obj.language_code, 'en')
+            self.assertEqual(obj.translated_field, NORMAL[1].translated_field['en'])
+            obj.switch_translation('ja')
+            self.assertEqual(obj.translated_field, NORMAL[1].translated_field['ja'])
+        with LanguageOverride('en'):
+            with self.assertNumQueries(0):
+                obj.switch_translation()
+                self.assertEqual(obj.language_code, 'en')
+
+    def test_switch_translation_missing(self):
+        obj = Normal.objects.language('en').get(pk=self.normal_id[1])
+        self.assertRaises(Normal._meta.translations_model.DoesNotExist,
+                          obj.switch_translation, 'de')
+        self.assertEqual(obj.language_code, 'en')
+
+    def test_switch_translation_descriptor(self):
+        obj = Normal.objects.untranslated().get(pk=self.normal_id[1])
+        with LanguageOverride('ja'):
+            with self.assertNumQueries(1):
+                self.assertEqual(obj.translated_field, NORMAL[1].translated_field['ja'])
+        with self.assertNumQueries(1):
+            obj.switch_translation('en')
+        with self.assertNumQueries(0):
+            obj.switch_translation('ja')
+            self.assertEqual(obj.translated_field, NORMAL[1].translated_field['ja'])
+
+    def test_translate_loaded(self):
+        obj = Normal.objects.language('en').get(pk=self.normal_id[1])
+        obj.switch_translation('ja')
+        obj.translated_field = 'modified'
+        with self.assertNumQueries(0):
+            obj.translate('en')
+            self.assertEqual(obj.translated_field, NORMAL[1].translated_field['en'])
+            obj.translate('ja')
+            self.assertEqual(obj.translated_field, 'modified')
+        obj.save()
+        self.assertEqual(Normal._meta.translations_model.objects.count(), 2)
+        with LanguageOverride('ja'):
+            self.assertEqual(self.reload(obj).translated_field, 'modified')
+
+
 class GetTest(HvadTestCase, NormalFixture):
     normal_count = 1
 
@@ -574,6 +638,137 @@ class GetOrCreateTest(HvadTestCase):
             )
 
 
+class UpdateOrCreateTest(HvadTestCase):
+    @minimumDjangoVersion(1, 7)
+    def test_create(self):
+        with self.assertNumQueries(7):
+            """
+            1: savepoint
+            2: get
+            3: savepoint
+            4: create shared
+            5: create translation
+            6: release savepoint
+            7: release savepoint
+            """
+            en, created = Normal.objects.language('en').update_or_create(
+                shared_field='shared',
+                defaults={'translated_field': 'English'},
+            )
+        self.assertTrue(created)
+        self.assertEqual(en.shared_field, 'shared')
+        self.assertEqual(en.translated_field, 'English')
+        self.assertEqual(en.language_code, 'en')
+
+    @minimumDjangoVersion(1, 7)
+    def test_update_translated(self):
+        en = Normal.objects.language('en').create(shared_field='shared',
+                                                  translated_field='English')
+        with self.assertNumQueries(4):
+            """
+            1: savepoint
+            2: get
+            3: update translation
+            4: release savepoint
+            """
+            obj, created = Normal.objects.language('en').update_or_create(
+                shared_field='shared',
+                defaults={'translated_field': 'English updated'},
+            )
+        self.assertFalse(created)
+        self.assertEqual(obj.pk, en.pk)
+        self.assertEqual(self.reload(obj).translated_field, 'English updated')
+
+    @minimumDjangoVersion(1, 7)
+    def test_update_shared(self):
+        en = Normal.objects.language('en').create(shared_field='shared',
+                                                  translated_field='English')
+        with self.assertNumQueries(4):
+            """
+            1: savepoint
+            2: get
+            3: update shared
+            4: release savepoint
+            """
+            obj, created = Normal.objects.language('en').update_or_create(
+                translated_field='English',
+                defaults={'shared_field': 'shared updated'},
+            )
+        self.assertFalse(created)
+        self.assertEqual(obj.pk, en.pk)
+        with LanguageOverride('en'):
+            self.assertEqual(self.reload(obj).shared_field, 'shared updated')
+
+    @minimumDjangoVersion(1, 7)
+    def test_update_both_unchanged(self):
+        Normal.objects.language('en').create(shared_field='shared',
+                                             translated_field='English')
+        with self.assertNumQueries(5):
+            obj, created = Normal.objects.language('en').update_or_create(
+                shared_field='shared',
+                defaults={'shared_field': 'shared updated',
+                          'translated_field': 'English updated'},
+            )
+        self.assertFalse(created)
+        with self.assertNumQueries(3):
+            """ savepoint, get, release savepoint - nothing changed """
+            Normal.objects.language('en').update_or_create(
+                shared_field='shared updated',
+                defaults={'translated_field': 'English updated'},
+            )
+        with LanguageOverride('en'):
+            obj = self.reload(obj)
+        self.assertEqual(obj.shared_field, 'shared updated')
+        self.assertEqual(obj.translated_field, 'English updated')
+
+    @minimumDjangoVersion(1, 7)
+    def test_update_shared_signals(self):
+        from django.db.models.signals import pre_save, post_save
+        Normal.objects.language('en').create(shared_field='shared',
+                                             translated_field='English')
+        saved = []
+        def receiver(sender, instance, update_fields=None, **kwargs):
+            saved.append((instance.shared_field, update_fields))
+        pre_save.connect(receiver, sender=Normal)
+        post_save.connect(receiver, sender=Normal)
+        try:
+            Normal.objects.language('en').update_or_create(
+                translated_field='English',
+                defaults={'shared_field': 'shared updated'},
+            )
+        finally:
+            pre_save.disconnect(receiver, sender=Normal)
+            post_save.disconnect(receiver, sender=Normal)
+        self.assertEqual(saved, [('shared updated', frozenset(['shared_field']))] * 2)
+
+    @minimumDjangoVersion(1, 7)
+    def test_create_translation_fallbacks(self):
+        ja = Normal.objects.language('ja').create(shared_field='shared',
+                                                  translated_field='Japanese')
+        with self.assertNumQueries(6):
+            """
+            1: savepoint
+            2: get in English
+            3: get shared
+            4: update shared
+            5: create translation
+            6: release savepoint
+            """
+            obj, created = (Normal.objects.language('en').fallbacks('ja')
+                                          .update_or_create(pk=ja.pk,
+                                                            defaults={'translated_field': 'new'}))
+        self.assertTrue(created)
+        self.assertEqual(obj.pk, ja.pk)
+        self.assertEqual(obj.language_code, 'en')
+        self.assertEqual(Normal.objects.language('en').get(pk=ja.pk).translated_field, 'new')
+        self.assertEqual(Normal.objects.language('ja').get(pk=ja.pk).translated_field, 'Japanese')
+
+    @minimumDjangoVersion(1, 7)
+    def test_all_languages(self):
+        self.assertRaises(ValueError, Normal.objects.language('all').update_or_create,
+                          shared_field='shared', defaults={'translated_field': 'new'})
+
+
 class BooleanTests(HvadTestCase):
     def test_boolean_on_shared(self):
         Boolean.objects.language('en').create(shared_flag=True, translated_flag=False)
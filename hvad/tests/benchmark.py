@@ -0,0 +1,198 @@
+# -*- coding: utf-8 -*-
+import os
+import sys
+import time
+from hvad.manager import FALLBACK_STRATEGIES, LEGACY_FALLBACKS
+from hvad.test_utils.testcase import HvadTestCase, minimumDjangoVersion
+from hvad.test_utils.project.app.models import Normal, NormalProxy, Related
+
+# Setting HVAD_BENCHMARK to a number of rows runs the benchmark with that many
+# rows and prints results. Otherwise, only a few rows are used and the
+# benchmark merely checks the results.
+BENCHMARK_ROWS = int(os.environ.get('HVAD_BENCHMARK', 0))
+
+
+def best_time(repeat, func):
+    best = None
+    for _ in range(repeat):
+        start = time.time()
+        func()
+        elapsed = time.time() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return max(best, 1e-6)
+
+
+class RoutingBenchmarkTests(HvadTestCase):
+    """ Measures operations that tell shared fields from translated fields """
+    rows = BENCHMARK_ROWS or 10
+    repeat = 5 if BENCHMARK_ROWS else 1
+
+    def report(self, name, best):
+        if BENCHMARK_ROWS:
+            sys.stderr.write('\n%s: %d ops/sec ' % (name, self.rows / best))
+
+    def test_init(self):
+        def init():
+            for index in range(self.rows):
+                Normal(shared_field='shared', translated_field='translated')
+        self.report('init', best_time(self.repeat, init))
+        obj = Normal(shared_field='shared', translated_field='translated')
+        self.assertEqual(obj.shared_field, 'shared')
+        self.assertEqual(obj.translated_field, 'translated')
+
+    def test_split_kwargs(self):
+        def split():
+            for index in range(self.rows):
+                Normal.objects.language('en')._split_kwargs(shared_field='shared',
+                                                            translated_field='translated')
+        self.report('split_kwargs', best_time(self.repeat, split))
+        self.assertEqual(Normal.objects.language('en')._split_kwargs(
+                             shared_field='shared', translated_field='translated'),
+                         ({'shared_field': 'shared'}, {'translated_field': 'translated'}))
+
+    def test_filter(self):
+        def build():
+            for index in range(self.rows):
+                Normal.objects.language('en').filter(shared_field='shared',
+                                                     translated_field='translated')
+        with self.assertNumQueries(0):
+            self.report('filter', best_time(self.repeat, build))
+
+
+class IterBenchmarkTests(HvadTestCase):
+    rows = BENCHMARK_ROWS or 10
+    repeat = 5 if BENCHMARK_ROWS else 1
+
+    def setUp(self):
+        super(IterBenchmarkTests, self).setUp()
+        NormalTranslation = Normal._meta.translations_model
+        RelatedTranslation = Related._meta.translations_model
+        Normal.objects.untranslated().bulk_create([
+            Normal(pk=pk, shared_field='shared %d' % pk) for pk in range(1, self.rows + 1)
+        ])
+        NormalTranslation.objects.bulk_create([
+            NormalTranslation(master_id=pk, language_code='en',
+                              translated_field='English %d' % pk)
+            for pk in range(1, self.rows + 1)
+        ])
+        Related.objects.untranslated().bulk_create([
+            Related(pk=pk, normal_id=pk) for pk in range(1, self.rows + 1)
+        ])
+        RelatedTranslation.objects.bulk_create([
+            RelatedTranslation(master_id=pk, language_code='en')
+            for pk in range(1, self.rows + 1)
+        ])
+
+    def measure(self, name, qs, check):
+        best = best_time(self.repeat, lambda: list(qs.all()))
+        objs = list(qs.all())
+        self.assertEqual(len(objs), self.rows)
+        with self.assertNumQueries(0):
+            for obj in objs:
+                check(obj)
+        if BENCHMARK_ROWS:
+            sys.stderr.write('\n%s: %d rows/sec ' % (name, self.rows / best))
+
+    def test_plain(self):
+        def check(obj):
+            self.assertEqual(obj.translated_field, 'English %d' % obj.pk)
+        self.measure('plain', Normal.objects.language('en'), check)
+
+    def test_proxy(self):
+        def check(obj):
+            self.assertIsInstance(obj, NormalProxy)
+            self.assertEqual(obj.translated_field, 'English %d' % obj.pk)
+        self.measure('proxy', NormalProxy.objects.language('en'), check)
+
+    def test_extra_select(self):
+        def check(obj):
+            self.assertEqual(obj.double_id, obj.pk * 2)
+            self.assertEqual(obj.translated_field, 'English %d' % obj.pk)
+        qs = Normal.objects.language('en').extra(
+            select={'double_id': '%s.id * 2' % Normal._meta.db_table})
+        self.measure('extra select', qs, check)
+
+    def test_select_related(self):
+        def check(obj):
+            self.assertEqual(obj.language_code, 'en')
+            self.assertEqual(obj.normal.translated_field, 'English %d' % obj.pk)
+        qs = Related.objects.language('en').select_related('normal')
+        self.measure('select_related', qs, check)
+
+    def test_chain(self):
+        depth = 20
+        def chain():
+            for _ in range(self.rows):
+                qs = Normal.objects.language('en')
+                for _ in range(depth):
+                    qs = qs.filter(shared_field__startswith='shared').order_by('pk')
+            return qs
+        best = best_time(self.repeat, chain)
+        self.assertEqual(chain().count(), self.rows)
+        if BENCHMARK_ROWS:
+            sys.stderr.write('\nchain: %d clones/sec ' % (2 * depth * self.rows / best))
+
+
+class FallbackBenchmarkTests(HvadTestCase):
+    """ Compares fallback strategies on full iteration, get() and slices,
+        with several translations per instance.
+    """
+    rows = BENCHMARK_ROWS or 10
+    repeat = 5 if BENCHMARK_ROWS else 1
+    languages = ('en', 'ja', 'de', 'fr', 'it')
+    fallbacks = ('de', 'ja', 'en')
+
+    def setUp(self):
+        super(FallbackBenchmarkTests, self).setUp()
+        NormalTranslation = Normal._meta.translations_model
+        Normal.objects.untranslated().bulk_create([
+            Normal(pk=pk, shared_field='shared %d' % pk) for pk in range(1, self.rows + 1)
+        ])
+        # odd instances have no German translation
+        NormalTranslation.objects.bulk_create([
+            NormalTranslation(master_id=pk, language_code=language,
+                              translated_field='%s %d' % (language, pk))
+            for pk in range(1, self.rows + 1)
+            for language in self.languages
+            if language != 'de' or pk % 2 == 0
+        ])
+
+    def check(self, obj):
+        self.assertEqual(obj.language_code, 'ja' if obj.pk % 2 else 'de')
+        self.assertEqual(obj.translated_field, '%s %d' % (obj.language_code, obj.pk))
+
+    def measure(self, name, make_qs):
+        def iterate():
+            objs = list(make_qs())
+            self.assertEqual(len(objs), self.rows)
+        def get():
+            self.check(make_qs().get(pk=self.rows))
+        def first_page():
+            objs = list(make_qs().order_by('pk')[:10])
+            for obj in objs:
+                self.check(obj)
+        results = [(step.__name__, best_time(self.repeat, step))
+                   for step in (iterate, get, first_page)]
+        for obj in make_qs():
+            self.check(obj)
+        if BENCHMARK_ROWS:
+            sys.stderr.write('\n%s: %s ' % (name, ', '.join(
+                '%s %.1f ms' % (step, elapsed * 1000) for step, elapsed in results)))
+
+    @minimumDjangoVersion(1, 6)
+    def test_fallbacks(self):
+        for strategy in FALLBACK_STRATEGIES:
+            self.measure('fallbacks %s' % strategy,
+                         lambda: Normal.objects.language(self.fallbacks[0])
+                                               .fallbacks(*self.fallbacks[1:])
+                                               .fallback_strategy(strategy))
+
+    @minimumDjangoVersion(1, 6)
+    def test_use_fallbacks(self):
+        if LEGACY_FALLBACKS:
+            return
+        for strategy in FALLBACK_STRATEGIES:
+            self.measure('use_fallbacks %s' % strategy,
+                         lambda: Normal.objects.untranslated()
+                                               .use_fallbacks(*self.fallbacks)
+                                               .fallback_strategy(strategy))
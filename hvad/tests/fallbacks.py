@@ -1,11 +1,13 @@
 # -*- coding: utf-8 -*-
+from django.db import connection
 from hvad.test_utils.context_managers import LanguageOverride
 from hvad.test_utils.data import NORMAL
-from hvad.test_utils.testcase import HvadTestCase
+from hvad.test_utils.testcase import HvadTestCase, minimumDjangoVersion
 from hvad.test_utils.project.app.models import Normal
 from hvad.test_utils.fixtures import NormalFixture
 from hvad.exceptions import WrongManager
-from hvad.manager import LEGACY_FALLBACKS
+from hvad.manager import (LEGACY_FALLBACKS, BetterTranslationsField,
+                          supports_window_functions)
 
 class FallbackTests(HvadTestCase, NormalFixture):
     normal_count = 2
@@ -141,6 +143,16 @@ class FallbackCachingTests(HvadTestCase, NormalFixture):
         self.assertTrue(qs)
         self._try_all_cache_using_methods(qs, 1)
 
+    def test_memoize_count(self):
+        qs = Normal.objects.untranslated().use_fallbacks().memoize_count()
+        with self.assertNumQueries(1):
+            self.assertEqual(qs.count(), 2)
+            self.assertEqual(qs.count(), 2)
+        with self.assertNumQueries(1):
+            self.assertEqual(qs.filter(pk=self.normal_id[1]).count(), 1)
+        with self.assertNumQueries(1):
+            self.assertEqual(qs.memoize_count(False).count(), 2)
+
 
 class FallbackIterTests(HvadTestCase, NormalFixture):
     normal_count = 2
@@ -169,6 +181,54 @@ class FallbackIterTests(HvadTestCase, NormalFixture):
         self.assertEqual(len(Normal.objects.untranslated().use_fallbacks('en', 'ja').all()),
                          len(Normal.objects.untranslated()))
 
+    def test_iterate_batches(self):
+        qs = Normal.objects.untranslated().use_fallbacks('ja', 'en')
+        batches = list(qs.iterate_batches(1))
+        self.assertEqual([[obj.pk for obj in batch] for batch in batches],
+                         [[self.normal_id[1]], [self.normal_id[2]]])
+        for index, (obj,) in enumerate(batches, 1):
+            self.assertEqual(obj.translated_field, NORMAL[index].translated_field['ja'])
+        self.assertEqual([[obj.pk for obj in batch] for batch in qs.iterate_batches(1, None)],
+                         [[self.normal_id[1]], [self.normal_id[2]]])
+
+    def test_iter_streaming(self):
+        master = Normal._meta.translations_model._meta.get_field('master')
+        with self.assertNumQueries(2 if LEGACY_FALLBACKS else 1):
+            iterator = (Normal.objects.untranslated().use_fallbacks('ja', 'en')
+                                                     .order_by('pk').iterator())
+            obj = next(iterator)
+            # field must be reset while rows are still pending
+            self.assertFalse(master.unique)
+            self.assertEqual(obj.translated_field, NORMAL[1].translated_field['ja'])
+            obj = next(iterator)
+            self.assertEqual(obj.translated_field, NORMAL[2].translated_field['ja'])
+            self.assertRaises(StopIteration, next, iterator)
+
+
+
+class FallbackPrefetchTranslationsTests(HvadTestCase, NormalFixture):
+    normal_count = 2
+
+    def test_prefetch_untranslated(self):
+        with LanguageOverride('ja'):
+            with self.assertNumQueries(2):
+                objs = list(Normal.objects.untranslated().prefetch_translations().order_by('pk'))
+            with self.assertNumQueries(0):
+                for index, obj in enumerate(objs, 1):
+                    self.assertEqual(obj.translated_field, NORMAL[index].translated_field['ja'])
+                    self.assertCountEqual(obj.get_available_languages(), self.translations)
+
+    def test_prefetch_fallbacks(self):
+        from hvad.utils import get_translation
+        with self.assertNumQueries(3 if LEGACY_FALLBACKS else 2):
+            objs = list(Normal.objects.untranslated().use_fallbacks('ja', 'en')
+                                                     .prefetch_translations('en')
+                                                     .order_by('pk'))
+        with self.assertNumQueries(0):
+            for index, obj in enumerate(objs, 1):
+                self.assertEqual(obj.translated_field, NORMAL[index].translated_field['ja'])
+                self.assertEqual(get_translation(obj, 'en').translated_field,
+                                 NORMAL[index].translated_field['en'])
 
 
 class FallbackValuesListTests(HvadTestCase, NormalFixture):
@@ -186,6 +246,29 @@ class FallbackValuesListTests(HvadTestCase, NormalFixture):
         with self.assertRaises(WrongManager):
             values = Normal.objects.untranslated().values_list('translated_field', flat=True)
 
+    def test_values_list_fallbacks(self):
+        if LEGACY_FALLBACKS:
+            return
+        (Normal.objects.language('en')
+                       .filter(shared_field=NORMAL[1].shared_field)
+                       .delete_translations())
+        untranslated = Normal.objects.untranslated().create(shared_field='untranslated')
+        qs = (Normal.objects.untranslated().use_fallbacks('en', 'ja')
+                            .values_list('pk', 'translated_field')
+                            .order_by('pk'))
+        self.assertEqual(qs.count(), 3)
+        with self.assertNumQueries(1):
+            self.assertEqual(list(qs), [
+                (self.normal_id[1], NORMAL[1].translated_field['ja']),
+                (self.normal_id[2], NORMAL[2].translated_field['en']),
+                (untranslated.pk, None),
+            ])
+        qs = (Normal.objects.untranslated().use_fallbacks('ja', 'en')
+                            .values_list('translated_field', flat=True)
+                            .filter(pk__in=list(self.normal_id.values())))
+        self.assertCountEqual(qs, [NORMAL[1].translated_field['ja'],
+                                   NORMAL[2].translated_field['ja']])
+
 
 class FallbackValuesTests(HvadTestCase, NormalFixture):
     normal_count = 2
@@ -206,6 +289,68 @@ class FallbackValuesTests(HvadTestCase, NormalFixture):
         with self.assertRaises(WrongManager):
             values = Normal.objects.untranslated().values('translated_field')
 
+    def test_values_fallbacks(self):
+        if LEGACY_FALLBACKS:
+            return
+        (Normal.objects.language('en')
+                       .filter(shared_field=NORMAL[1].shared_field)
+                       .delete_translations())
+        with LanguageOverride('en'):
+            qs = (Normal.objects.untranslated().use_fallbacks(None, 'ja')
+                                .values('pk', 'translated_field', 'language_code')
+                                .order_by('pk'))
+        with LanguageOverride('en'):
+            with self.assertNumQueries(1):
+                self.assertEqual(list(qs), [
+                    {'pk': self.normal_id[1], 'language_code': 'ja',
+                     'translated_field': NORMAL[1].translated_field['ja']},
+                    {'pk': self.normal_id[2], 'language_code': 'en',
+                     'translated_field': NORMAL[2].translated_field['en']},
+                ])
+            values = (Normal.objects.untranslated().use_fallbacks('en', 'ja')
+                                    .values().get(pk=self.normal_id[2]))
+        self.assertEqual(values, {
+            'id': self.normal_id[2], 'shared_field': NORMAL[2].shared_field,
+            'translated_field': NORMAL[2].translated_field['en'], 'language_code': 'en',
+        })
+
+
+class FallbackNamedTests(HvadTestCase, NormalFixture):
+    normal_count = 2
+
+    def test_named_untranslated(self):
+        qs = Normal.objects.untranslated().named().order_by('pk')
+        with self.assertNumQueries(1):
+            rows = list(qs)
+        self.assertEqual(rows[0]._fields, ('id', 'shared_field'))
+        self.assertEqual([tuple(row) for row in rows],
+                         [(self.normal_id[1], NORMAL[1].shared_field),
+                          (self.normal_id[2], NORMAL[2].shared_field)])
+        with self.assertRaises(WrongManager):
+            Normal.objects.untranslated().named('translated_field')
+
+    def test_named_fallbacks(self):
+        if LEGACY_FALLBACKS:
+            return
+        (Normal.objects.language('en')
+                       .filter(shared_field=NORMAL[1].shared_field)
+                       .delete_translations())
+        untranslated = Normal.objects.untranslated().create(shared_field='untranslated')
+        with LanguageOverride('en'):
+            qs = (Normal.objects.untranslated().use_fallbacks(None, 'ja')
+                                .named('pk', 'translated_field', 'language_code')
+                                .order_by('pk'))
+        with LanguageOverride('de'):
+            self.assertEqual(qs.count(), 3)
+        with LanguageOverride('en'):
+            with self.assertNumQueries(1):
+                rows = list(qs)
+        self.assertEqual([tuple(row) for row in rows], [
+            (self.normal_id[1], NORMAL[1].translated_field['ja'], 'ja'),
+            (self.normal_id[2], NORMAL[2].translated_field['en'], 'en'),
+            (untranslated.pk, None, None),
+        ])
+
 
 class FallbackInBulkTests(HvadTestCase, NormalFixture):
     normal_count = 2
@@ -246,6 +391,109 @@ class FallbackInBulkTests(HvadTestCase, NormalFixture):
             self.assertEqual(result[pk2].language_code, 'en')
 
 
+class FallbackSQLTests(HvadTestCase):
+    def _get_sql(self, fallbacks):
+        constraint = BetterTranslationsField(fallbacks).get_extra_restriction(None, 'T1', 'T2')
+        return constraint.as_sql(lambda name: name, None)
+
+    def test_parameterized_languages(self):
+        sql, params = self._get_sql(('ja', 'en', 'ja'))
+        self.assertEqual(params, ['ja', 'en', 'ja', 'en'])
+        self.assertNotIn('ja', sql)
+        self.assertNotIn('en', sql.replace('language_code', ''))
+
+    def test_shared_sql(self):
+        sql, params = self._get_sql(('ja', 'en'))
+        other_sql, other_params = self._get_sql(('fr', 'de'))
+        self.assertEqual(sql, other_sql)
+        self.assertEqual(other_params, ['fr', 'de', 'fr', 'de'])
+        self.assertNotEqual(self._get_sql(('ja',))[0], sql)
+
+
+class WindowFallbackTests(HvadTestCase, NormalFixture):
+    normal_count = 2
+
+    def _check_window_used(self, queries):
+        self.assertEqual(len(queries), 1)
+        self.assertEqual('ROW_NUMBER()' in queries[0]['sql'],
+                         supports_window_functions(connection))
+
+    @minimumDjangoVersion(1, 6)
+    def test_translation_queryset(self):
+        from django.test.utils import CaptureQueriesContext
+        (Normal.objects.language('en')
+                       .filter(shared_field=NORMAL[1].shared_field)
+                       .delete_translations())
+        for strategy in ('selfjoin', 'window'):
+            qs = (Normal.objects.language('en').fallbacks('ja')
+                                .fallback_strategy(strategy).order_by('pk'))
+            with CaptureQueriesContext(connection) as ctx:
+                objs = list(qs)
+            if strategy == 'window':
+                self._check_window_used(ctx.captured_queries)
+            self.assertEqual([obj.pk for obj in objs], [self.normal_id[1], self.normal_id[2]])
+            self.assertEqual([obj.language_code for obj in objs], ['ja', 'en'])
+            self.assertEqual(objs[0].translated_field, NORMAL[1].translated_field['ja'])
+            self.assertEqual(qs.count(), 2)
+
+    @minimumDjangoVersion(1, 6)
+    def test_untranslated(self):
+        from django.test.utils import CaptureQueriesContext
+        if LEGACY_FALLBACKS:
+            return
+        untranslated = Normal.objects.untranslated().create(shared_field='untranslated')
+        qs = (Normal.objects.untranslated().use_fallbacks('ja', 'en')
+                            .fallback_strategy('window').order_by('pk'))
+        with CaptureQueriesContext(connection) as ctx:
+            objs = list(qs)
+        self._check_window_used(ctx.captured_queries)
+        self.assertEqual([obj.pk for obj in objs],
+                         [self.normal_id[1], self.normal_id[2], untranslated.pk])
+        with self.assertNumQueries(0):
+            self.assertEqual(objs[0].translated_field, NORMAL[1].translated_field['ja'])
+            self.assertEqual(objs[1].translated_field, NORMAL[2].translated_field['ja'])
+
+    @minimumDjangoVersion(1, 6)
+    def test_setting(self):
+        from django.test.utils import CaptureQueriesContext
+        with self.settings(HVAD_FALLBACK_STRATEGY='window'):
+            with CaptureQueriesContext(connection) as ctx:
+                obj = Normal.objects.language('de').fallbacks('ja', 'en').get(pk=self.normal_id[1])
+            self._check_window_used(ctx.captured_queries)
+            self.assertEqual(obj.language_code, 'ja')
+            with CaptureQueriesContext(connection) as ctx:
+                obj = (Normal.objects.language('de').fallbacks('ja', 'en')
+                                     .fallback_strategy('selfjoin').get(pk=self.normal_id[1]))
+            self.assertNotIn('ROW_NUMBER()', ctx.captured_queries[0]['sql'])
+            self.assertEqual(obj.language_code, 'ja')
+
+    def test_invalid_setting(self):
+        override = self.settings(HVAD_FALLBACK_STRATEGY='windows')
+        try:
+            self.assertRaises(ValueError, override.enable)
+        finally:
+            override.disable()
+
+    @minimumDjangoVersion(1, 6)
+    def test_ranking_restricted(self):
+        from django.test.utils import CaptureQueriesContext
+        master = connection.ops.quote_name(Normal._meta.translations_model
+                                           ._meta.get_field('master').column)
+        qs = (Normal.objects.language('de').fallbacks('ja', 'en')
+                            .fallback_strategy('window').order_by('-pk'))
+        with CaptureQueriesContext(connection) as ctx:
+            objs = list(qs[:1])
+        self._check_window_used(ctx.captured_queries)
+        if supports_window_functions(connection):
+            # ranked translations are correlated to the row's master
+            self.assertIn('WHERE %s = ' % master, ctx.captured_queries[0]['sql'])
+        self.assertEqual([(obj.pk, obj.language_code) for obj in objs],
+                         [(self.normal_id[2], 'ja')])
+
+    def test_invalid_strategy(self):
+        self.assertRaises(ValueError, Normal.objects.untranslated().fallback_strategy, 'magic')
+
+
 class FallbackNotImplementedTests(HvadTestCase):
     def test_defer(self):
         baseqs = Normal.objects.untranslated()
@@ -1,12 +1,17 @@
 # -*- coding: utf-8 -*-
 import django
 from django.db import connection
+from django.db.models.fields import FieldDoesNotExist
 from django.db.models.query_utils import Q
+from hvad.manager import BatchQueryset
+from hvad.query import q_keys
 from hvad.test_utils.context_managers import LanguageOverride
 from hvad.test_utils.data import NORMAL, STANDARD
 from hvad.test_utils.testcase import HvadTestCase, minimumDjangoVersion
-from hvad.test_utils.project.app.models import Normal, AggregateModel, Standard, SimpleRelated
+from hvad.test_utils.project.app.models import (Normal, AggregateModel, Standard, SimpleRelated,
+                                                MultipleFields, NormalProxy)
 from hvad.test_utils.fixtures import NormalFixture, StandardFixture
+from hvad.utils import get_cached_translation
 
 class FilterTests(HvadTestCase, NormalFixture):
     normal_count = 2
@@ -144,6 +149,35 @@ class QueryCachingTests(HvadTestCase, NormalFixture):
             self.assertTrue(qs)
             self._try_all_cache_using_methods(qs, 1)
 
+    def test_shared_state(self):
+        qs = Normal.objects.language('en').prefetch_translations('ja')
+        clone = qs.filter(pk=self.normal_id[1])
+        self.assertIs(clone._hvad_state, qs._hvad_state)
+        clone.language('ja')
+        self.assertEqual(clone._language_code, 'ja')
+        self.assertEqual(clone._prefetch_languages, ('ja',))
+        self.assertEqual(qs._language_code, 'en')
+
+    def test_reuse_after_query(self):
+        qs = Normal.objects.language('en').filter(pk=self.normal_id[1])
+        self.assertEqual(qs.count(), 1)
+        self.assertTrue(qs.exists())
+        self.assertEqual(qs.update(translated_field='test'), 1)
+        self.assertEqual([obj.translated_field for obj in qs.iterator()], ['test'])
+        self.assertEqual([obj.translated_field for obj in qs.iterator()], ['test'])
+        self.assertFalse(qs._language_filter_tag)
+
+    def test_get_single_use(self):
+        qs = Normal.objects.language('en')
+        with self.assertNumQueries(1):
+            obj = qs.get(pk=self.normal_id[1])
+        self.assertEqual(obj.translated_field, NORMAL[1].translated_field['en'])
+        self.assertEqual(qs.get(shared_field=NORMAL[1].shared_field).pk, obj.pk)
+        self.assertFalse(qs._language_filter_tag)
+        self.assertRaises(Normal.DoesNotExist, qs.get, pk=-1)
+        self.assertRaises(Normal._meta.translations_model.MultipleObjectsReturned,
+                          Normal.objects.language('all').get, pk=self.normal_id[1])
+
 
 class IterTests(HvadTestCase, NormalFixture):
     normal_count = 2
@@ -173,6 +207,129 @@ class IterTests(HvadTestCase, NormalFixture):
                 self.assertEqual(obj.shared_field, NORMAL[index].shared_field)
                 self.assertEqual(obj.translated_field, NORMAL[index].translated_field['ja'])
 
+    def test_iterate_batches(self):
+        pk1, pk2 = self.normal_id[1], self.normal_id[2]
+        qs = Normal.objects.language('ja').order_by('-translated_field')
+        with self.assertNumQueries(3):
+            batches = list(qs.iterate_batches(1))
+        self.assertEqual([[obj.pk for obj in batch] for batch in batches], [[pk1], [pk2]])
+        self.assertEqual(batches[1][0].translated_field, NORMAL[2].translated_field['ja'])
+
+        with self.assertNumQueries(1):
+            batches = list(qs.iterate_batches(3, keys=('-shared_field',)))
+        self.assertEqual([[obj.pk for obj in batch] for batch in batches], [[pk2, pk1]])
+
+    def test_iterate_batches_all_languages(self):
+        pk1, pk2 = self.normal_id[1], self.normal_id[2]
+        qs = Normal.objects.language('all')
+        with self.assertNumQueries(2):
+            batches = list(qs.iterate_batches(3))
+        self.assertEqual([[(obj.pk, obj.language_code) for obj in batch] for batch in batches],
+                         [[(pk1, 'en'), (pk1, 'ja'), (pk2, 'en')], [(pk2, 'ja')]])
+
+
+class PrefetchTranslationsTests(HvadTestCase, NormalFixture):
+    normal_count = 2
+
+    def test_prefetch_all_translations(self):
+        from hvad.utils import get_translation
+        with LanguageOverride('en'):
+            with self.assertNumQueries(2):
+                objs = list(Normal.objects.language().prefetch_translations().order_by('pk'))
+            with self.assertNumQueries(0):
+                for index, obj in enumerate(objs, 1):
+                    self.assertEqual(obj.translated_field, NORMAL[index].translated_field['en'])
+                    self.assertEqual(get_translation(obj, 'ja').translated_field,
+                                     NORMAL[index].translated_field['ja'])
+                    self.assertCountEqual(obj.get_available_languages(), self.translations)
+
+    def test_prefetch_some_translations(self):
+        from hvad.utils import get_translation
+        with self.assertNumQueries(2):
+            objs = list(Normal.objects.language('en').prefetch_translations('ja', 'de'))
+        with self.assertNumQueries(0):
+            for obj in objs:
+                self.assertIs(get_translation(obj, 'en'), get_translation(obj, 'en'))
+                get_translation(obj, 'ja')
+                self.assertRaises(Normal._meta.translations_model.DoesNotExist,
+                                  get_translation, obj, 'de')
+        with LanguageOverride('ja'):
+            with self.assertNumQueries(0):
+                obj = objs[0]
+                delattr(obj, obj._meta.translations_cache)
+                self.assertEqual(obj.language_code, 'ja')
+
+    def test_prefetch_semantics(self):
+        qs = Normal.objects.language('en')
+        self.assertEqual(qs._prefetch_languages, None)
+        qs = qs.prefetch_translations('ja', None)
+        self.assertEqual(qs._prefetch_languages, ('ja', None))
+        self.assertEqual(qs.filter(pk=self.normal_id[1])._prefetch_languages, ('ja', None))
+        qs = qs.prefetch_translations(None)
+        self.assertEqual(qs._prefetch_languages, None)
+
+    def test_prefetch_then_translate(self):
+        from hvad.utils import get_translation
+        obj = Normal.objects.language('en').prefetch_translations('de').get(pk=self.normal_id[1])
+        obj.translate('de')
+        obj.translated_field = 'Deutsch'
+        obj.save()
+        with self.assertNumQueries(0):
+            self.assertEqual(get_translation(obj, 'de').translated_field, 'Deutsch')
+
+
+class BatchLoadingTests(HvadTestCase, NormalFixture):
+    normal_count = 2
+
+    def test_no_batch_by_default(self):
+        objs = list(Normal.objects.order_by('pk'))
+        with LanguageOverride('ja'):
+            with self.assertNumQueries(len(objs)):
+                for index, obj in enumerate(objs, 1):
+                    self.assertEqual(obj.translated_field, NORMAL[index].translated_field['ja'])
+
+    def test_batch_queryset(self):
+        with self.assertNumQueries(1):
+            objs = list(BatchQueryset(Normal).order_by('pk'))
+        with LanguageOverride('ja'):
+            with self.assertNumQueries(1):
+                for index, obj in enumerate(objs, 1):
+                    self.assertEqual(obj.translated_field, NORMAL[index].translated_field['ja'])
+        with LanguageOverride('en'):
+            with self.assertNumQueries(1):
+                for index, obj in enumerate(objs, 1):
+                    obj.switch_translation()
+                    self.assertEqual(obj.translated_field, NORMAL[index].translated_field['en'])
+
+    def test_batch_untranslated(self):
+        Normal.objects.language('ja').filter(pk=self.normal_id[1]).delete_translations()
+        with self.assertNumQueries(1):
+            objs = list(Normal.objects.untranslated().batch_translations().order_by('pk'))
+        with LanguageOverride('ja'):
+            with self.assertNumQueries(1):
+                self.assertRaises(AttributeError, getattr, objs[0], 'translated_field')
+                self.assertEqual(objs[1].translated_field, NORMAL[2].translated_field['ja'])
+
+    def test_batch_missing_created(self):
+        from hvad.utils import get_translation
+        Normal.objects.language('ja').filter(pk=self.normal_id[1]).delete_translations()
+        objs = list(Normal.objects.untranslated().batch_translations().order_by('pk'))
+        self.assertRaises(Normal._meta.translations_model.DoesNotExist,
+                          get_translation, objs[0], 'ja')
+        other = Normal.objects.untranslated().get(pk=self.normal_id[1]).translate('ja')
+        other.translated_field = 'created'
+        other.save()
+        objs[0].save()
+        with self.assertNumQueries(1):
+            self.assertEqual(get_translation(objs[0], 'ja').translated_field, 'created')
+
+    def test_batch_pickling(self):
+        import pickle
+        obj = pickle.loads(pickle.dumps(list(BatchQueryset(Normal).order_by('pk'))[0]))
+        with LanguageOverride('en'):
+            with self.assertNumQueries(1):
+                self.assertEqual(obj.translated_field, NORMAL[1].translated_field['en'])
+
 
 class UpdateTests(HvadTestCase, NormalFixture):
     normal_count = 2
@@ -366,6 +523,44 @@ class ValuesTests(HvadTestCase, NormalFixture):
         ]
         self.assertCountEqual(values_list, check)
 
+class NamedTests(HvadTestCase, NormalFixture):
+    normal_count = 2
+
+    def test_named_default_fields(self):
+        with self.assertNumQueries(1):
+            rows = list(Normal.objects.language('en').named().order_by('pk'))
+        self.assertEqual(rows[0]._fields,
+                         ('id', 'shared_field', 'translated_field', 'language_code'))
+        for index, row in enumerate(rows, 1):
+            self.assertEqual(row.id, self.normal_id[index])
+            self.assertEqual(row.shared_field, NORMAL[index].shared_field)
+            self.assertEqual(row.translated_field, NORMAL[index].translated_field['en'])
+            self.assertEqual(row.language_code, 'en')
+            self.assertIsInstance(row, tuple)
+
+    def test_named_fields(self):
+        qs = (Normal.objects.language('ja').named('translated_field', 'pk')
+                            .filter(shared_field=NORMAL[1].shared_field))
+        row, = qs
+        self.assertEqual(row._fields, ('translated_field', 'pk'))
+        self.assertEqual(row, (NORMAL[1].translated_field['ja'], self.normal_id[1]))
+        self.assertIs(type(row), type(Normal.objects.language('en').named('translated_field', 'pk')[0]))
+
+    def test_named_all_languages(self):
+        rows = Normal.objects.language('all').named('pk', 'language_code').order_by('pk', 'language_code')
+        self.assertEqual([tuple(row) for row in rows],
+                         [(self.normal_id[1], 'en'), (self.normal_id[1], 'ja'),
+                          (self.normal_id[2], 'en'), (self.normal_id[2], 'ja')])
+
+    @minimumDjangoVersion(1, 6)
+    def test_named_fallbacks(self):
+        (Normal.objects.language('en')
+                       .filter(shared_field=NORMAL[1].shared_field)
+                       .delete_translations())
+        rows = Normal.objects.language('en').fallbacks('ja').named('pk', 'language_code').order_by('pk')
+        self.assertEqual([tuple(row) for row in rows],
+                         [(self.normal_id[1], 'ja'), (self.normal_id[2], 'en')])
+
 class InBulkTests(HvadTestCase, NormalFixture):
     normal_count = 2
 
@@ -422,6 +617,41 @@ class InBulkTests(HvadTestCase, NormalFixture):
             self.assertEqual(result[pk1].translated_field, NORMAL[1].translated_field['en'])
             self.assertEqual(result[pk1].language_code, 'en')
 
+    def test_in_bulk_languages(self):
+        (Normal.objects.language('en')
+                       .filter(shared_field=NORMAL[2].shared_field)
+                       .delete_translations())
+        pk1, pk2 = self.normal_id[1], self.normal_id[2]
+        with self.assertNumQueries(1):
+            result = Normal.objects.language('all').in_bulk([pk1, pk2], languages=('en', 'ja'))
+        self.assertCountEqual((pk1, pk2), result)
+        self.assertCountEqual(('en', 'ja'), result[pk1])
+        self.assertCountEqual(('ja',), result[pk2])
+        for language_code in ('en', 'ja'):
+            obj = result[pk1][language_code]
+            self.assertEqual(obj.pk, pk1)
+            self.assertEqual(obj.shared_field, NORMAL[1].shared_field)
+            self.assertEqual(obj.language_code, language_code)
+            self.assertEqual(obj.translated_field, NORMAL[1].translated_field[language_code])
+
+        with LanguageOverride('en'):
+            result = Normal.objects.language('ja').in_bulk([pk1, pk2], languages=(None,))
+        self.assertEqual(list(result), [pk1])
+        self.assertEqual(list(result[pk1]), ['en'])
+
+        result = Normal.objects.language('en').in_bulk([pk1, pk2], languages=())
+        self.assertCountEqual(('en', 'ja'), result[pk1])
+        self.assertEqual(Normal.objects.language().in_bulk([], languages=()), {})
+
+    def test_in_bulk_languages_batches(self):
+        pk1, pk2 = self.normal_id[1], self.normal_id[2]
+        id_list = [pk1] + list(range(pk2 + 1, pk2 + 1996)) + [pk2]
+        # SQLite allows 999 parameters: 997 ids and both languages per query
+        with self.assertNumQueries(3 if connection.vendor == 'sqlite' else 1):
+            result = Normal.objects.language('en').in_bulk(id_list, languages=('en', 'ja'))
+        self.assertCountEqual((pk1, pk2), result)
+        self.assertCountEqual(('en', 'ja'), result[pk2])
+
 
 class DeleteTests(HvadTestCase, NormalFixture):
     normal_count = 2
@@ -502,20 +732,258 @@ class AggregateTests(HvadTestCase):
         self.assertEqual(AggregateModel.objects.language("en").aggregate(tnum=Avg("translated_number")), {'tnum': 10})
 
 
+class AnnotateTests(HvadTestCase, StandardFixture):
+    normal_count = 2
+    standard_count = 2
+
+    def test_annotate(self):
+        from django.db.models import Count, Max
+        self.create_standard(STANDARD[1])
+        qs = Normal.objects.language('en').annotate(Count('standards'),
+                                                    max_field=Max('translated_field'))
+        with self.assertNumQueries(1):
+            objs = list(qs.order_by('pk'))
+        self.assertEqual([obj.standards__count for obj in objs], [2, 1])
+        self.assertEqual([obj.max_field for obj in objs],
+                         [NORMAL[1].translated_field['en'], NORMAL[2].translated_field['en']])
+        self.assertEqual([obj.translated_field for obj in objs],
+                         [NORMAL[1].translated_field['en'], NORMAL[2].translated_field['en']])
+
+    def test_annotate_filter_order(self):
+        from django.db.models import Count
+        self.create_standard(STANDARD[2])
+        qs = Normal.objects.language('en').annotate(Count('standards'))
+        self.assertEqual([obj.pk for obj in qs.order_by('-standards__count')],
+                         [self.normal_id[2], self.normal_id[1]])
+        self.assertEqual([obj.pk for obj in qs.filter(standards__count__gt=1)],
+                         [self.normal_id[2]])
+        self.assertEqual(list(qs.order_by('pk').values_list('standards__count', flat=True)),
+                         [1, 2])
+
+
+class BulkCreateTests(HvadTestCase):
+    def test_bulk_create(self):
+        with LanguageOverride('en'):
+            objs = [Normal(shared_field=data.shared_field,
+                           translated_field=data.translated_field['en'])
+                    for data in NORMAL.values()]
+        # shared instances are inserted at once where pks can be returned
+        shared_queries = 1 if connection.vendor == 'postgresql' else len(objs)
+        with self.assertNumQueries(shared_queries + 2):
+            result = Normal.objects.language('en').bulk_create(objs)
+        self.assertIs(result, objs)
+        for obj, data in zip(objs, NORMAL.values()):
+            self.assertNotEqual(obj.pk, None)
+            self.assertNotEqual(get_cached_translation(obj).pk, None)
+            self.assertEqual(self.reload(obj).translated_field, data.translated_field['en'])
+
+        # translations can be saved again after being bulk created
+        objs[0].translated_field = 'changed'
+        objs[0].save()
+        self.assertEqual(Normal._meta.translations_model.objects.count(), len(objs))
+        with LanguageOverride('en'):
+            self.assertEqual(self.reload(objs[0]).translated_field, 'changed')
+
+    @minimumDjangoVersion(1, 5)
+    def test_bulk_create_with_pk(self):
+        objs = []
+        for index, data in NORMAL.items():
+            obj = Normal(pk=100 + index, shared_field=data.shared_field)
+            obj.translate('ja')
+            obj.translated_field = data.translated_field['ja']
+            objs.append(obj)
+        with self.assertNumQueries(6):
+            Normal.objects.language('ja').bulk_create(objs, batch_size=1)
+        with LanguageOverride('ja'):
+            for index, data in NORMAL.items():
+                obj = Normal.objects.language().get(pk=100 + index)
+                self.assertEqual(obj.shared_field, data.shared_field)
+                self.assertEqual(obj.translated_field, data.translated_field['ja'])
+
+    def test_bulk_create_batches(self):
+        objs = [Normal(shared_field='shared %d' % index) for index in range(5)]
+        for obj in objs[::2]:
+            obj.translate('en')
+            obj.translated_field = 'English %s' % obj.shared_field
+        Normal.objects.language('en').bulk_create(objs, batch_size=2)
+        self.assertEqual(len(set(obj.pk for obj in objs)), len(objs))
+        for obj in objs:
+            self.assertEqual(Normal.objects.untranslated().get(pk=obj.pk).shared_field,
+                             obj.shared_field)
+        with LanguageOverride('en'):
+            self.assertEqual([Normal.objects.get(pk=obj.pk).translated_field for obj in objs[::2]],
+                             ['English %s' % obj.shared_field for obj in objs[::2]])
+
+    def test_bulk_create_untranslated(self):
+        obj = Normal(shared_field=NORMAL[1].shared_field)
+        Normal.objects.language('en').bulk_create([obj])
+        self.assertEqual(Normal.objects.untranslated().get(pk=obj.pk).shared_field,
+                         NORMAL[1].shared_field)
+        self.assertEqual(Normal._meta.translations_model.objects.count(), 0)
+
+
+class BulkUpdateTranslationsTests(HvadTestCase, NormalFixture):
+    normal_count = 2
+    translations = ('en',)
+
+    def test_bulk_update_translations(self):
+        values = {
+            self.normal_id[1]: {'translated_field': u'日本語一'},
+            self.normal_id[2]: {'translated_field': u'日本語二'},
+        }
+        with self.assertNumQueries(2):
+            result = Normal.objects.language('ja').bulk_update_translations(values)
+        self.assertEqual(result, (2, 0))
+        values = {
+            self.normal_id[1]: {'translated_field': 'English one'},
+            self.normal_id[2]: {'translated_field': 'English two'},
+        }
+        with self.assertNumQueries(2):
+            result = Normal.objects.language('en').bulk_update_translations(values)
+        self.assertEqual(result, (0, 2))
+        self.assertEqual(Normal._meta.translations_model.objects.count(), 4)
+        for lang, names in (('ja', (u'日本語一', u'日本語二')),
+                            ('en', ('English one', 'English two'))):
+            with LanguageOverride(lang):
+                for index, name in enumerate(names, 1):
+                    obj = Normal.objects.language().get(pk=self.normal_id[index])
+                    self.assertEqual(obj.shared_field, NORMAL[index].shared_field)
+                    self.assertEqual(obj.translated_field, name)
+
+    def test_bulk_update_translations_mixed(self):
+        values = {
+            self.normal_id[1]: {'translated_field': 'English one'},
+            self.normal_id[2]: {},
+        }
+        with LanguageOverride('en'):
+            with self.assertNumQueries(2):
+                result = Normal.objects.language().bulk_update_translations(values, batch_size=1)
+            self.assertEqual(result, (0, 1))
+            self.assertEqual(Normal.objects.language().get(pk=self.normal_id[1]).translated_field,
+                             'English one')
+            self.assertEqual(Normal.objects.language().get(pk=self.normal_id[2]).translated_field,
+                             NORMAL[2].translated_field['en'])
+
+    def test_bulk_update_translations_batches(self):
+        Normal.objects.language('ja').filter(pk=self.normal_id[1]).bulk_update_translations(
+            {self.normal_id[1]: {'translated_field': u'日本語一'}})
+        values = {
+            self.normal_id[1]: {'translated_field': u'日本語'},
+            self.normal_id[2]: {'translated_field': u'日本語二'},
+        }
+        with self.assertNumQueries(4):
+            result = Normal.objects.language('ja').bulk_update_translations(values, batch_size=1)
+        self.assertEqual(result, (1, 1))
+        with LanguageOverride('ja'):
+            self.assertEqual([obj.translated_field for obj in
+                              Normal.objects.language().order_by('pk')],
+                             [u'日本語', u'日本語二'])
+
+    def test_bulk_update_translations_max_params(self):
+        # 333 rows use 1000 parameters, SQLite only allows 999
+        extra = Normal.objects.language('en').bulk_create(
+            [Normal(shared_field='extra %d' % index) for index in range(331)])
+        pks = [self.normal_id[1], self.normal_id[2]] + [obj.pk for obj in extra]
+        values = dict((pk, {'translated_field': 'updated %d' % pk}) for pk in pks)
+        Normal.objects.language('ja').bulk_update_translations(values)
+        with self.assertNumQueries(4 if connection.vendor == 'sqlite' else 2):
+            """ per batch: find existing translations, update them """
+            result = Normal.objects.language('ja').bulk_update_translations(values, batch_size=1000)
+        self.assertEqual(result, (0, 333))
+        self.assertEqual(Normal.objects.language('ja').filter(
+            translated_field__startswith='updated').count(), 333)
+
+    def test_bulk_update_translations_invalid(self):
+        qs = Normal.objects.language('en')
+        self.assertRaises(ValueError, qs.bulk_update_translations,
+                          {self.normal_id[1]: {'language_code': 'ja'}})
+        self.assertRaises(ValueError, qs.bulk_update_translations,
+                          {self.normal_id[1]: {'master': None}})
+        self.assertRaises(FieldDoesNotExist, qs.bulk_update_translations,
+                          {self.normal_id[1]: {'shared_field': 'foo'}})
+        self.assertRaises(ValueError, Normal.objects.language('all').bulk_update_translations,
+                          {self.normal_id[1]: {'translated_field': 'foo'}})
+
+
+class DeferTests(HvadTestCase, NormalFixture):
+    normal_count = 2
+
+    def test_defer(self):
+        qs = Normal.objects.language('en').defer('translated_field', 'shared_field')
+        with self.assertNumQueries(1):
+            objs = list(qs.order_by('pk'))
+        for index, obj in enumerate(objs, 1):
+            with self.assertNumQueries(0):
+                self.assertEqual(obj.language_code, 'en')
+            with self.assertNumQueries(1):
+                self.assertEqual(obj.translated_field, NORMAL[index].translated_field['en'])
+            with self.assertNumQueries(1):
+                self.assertEqual(obj.shared_field, NORMAL[index].shared_field)
+
+    def test_defer_proxy(self):
+        with self.assertNumQueries(1):
+            obj = NormalProxy.objects.language('en').defer('shared_field').get(pk=self.normal_id[1])
+        self.assertIsInstance(obj, NormalProxy)
+        with self.assertNumQueries(0):
+            self.assertEqual(obj.translated_field, NORMAL[1].translated_field['en'])
+        with self.assertNumQueries(1):
+            self.assertEqual(obj.shared_field, NORMAL[1].shared_field)
+
+    def test_defer_required(self):
+        with self.assertNumQueries(1):
+            obj = Normal.objects.language('en').defer('master', 'language_code').get(pk=self.normal_id[1])
+        with self.assertNumQueries(0):
+            self.assertEqual(obj.language_code, 'en')
+            self.assertEqual(obj.shared_field, NORMAL[1].shared_field)
+            self.assertEqual(obj.translated_field, NORMAL[1].translated_field['en'])
+
+    def test_only(self):
+        qs = Normal.objects.language('ja').only('shared_field')
+        with self.assertNumQueries(1):
+            obj = qs.get(pk=self.normal_id[1])
+        with self.assertNumQueries(0):
+            self.assertEqual(obj.language_code, 'ja')
+            self.assertEqual(obj.shared_field, NORMAL[1].shared_field)
+        with self.assertNumQueries(1):
+            self.assertEqual(obj.translated_field, NORMAL[1].translated_field['ja'])
+
+        qs = Normal.objects.language('ja').only('translated_field')
+        with self.assertNumQueries(1):
+            obj = qs.get(pk=self.normal_id[1])
+        with self.assertNumQueries(0):
+            # no shared field listed, so they are all loaded
+            self.assertEqual(obj.translated_field, NORMAL[1].translated_field['ja'])
+            self.assertEqual(obj.shared_field, NORMAL[1].shared_field)
+
+    def test_defer_save(self):
+        obj = Normal.objects.language('en').defer('shared_field').get(pk=self.normal_id[1])
+        obj.translated_field = 'changed'
+        obj.save()
+        obj = Normal.objects.language('en').get(pk=self.normal_id[1])
+        self.assertEqual(obj.shared_field, NORMAL[1].shared_field)
+        self.assertEqual(obj.translated_field, 'changed')
+
+    def test_defer_save_multiple_fields(self):
+        MultipleFields.objects.language('en').create(
+            first_shared_field='first', second_shared_field='second',
+            first_translated_field='English 1', second_translated_field='English 2')
+        obj = MultipleFields.objects.language('en').defer('second_shared_field').get()
+        obj.first_shared_field = 'first changed'
+        obj.first_translated_field = 'changed'
+        obj.save()
+        obj = MultipleFields.objects.language('en').get()
+        self.assertEqual(obj.first_shared_field, 'first changed')
+        self.assertEqual(obj.second_shared_field, 'second')
+        self.assertEqual(obj.first_translated_field, 'changed')
+        self.assertEqual(obj.second_translated_field, 'English 2')
+
+
 class NotImplementedTests(HvadTestCase):
     def test_defer(self):
         baseqs = SimpleRelated.objects.language('en')
         
-        self.assertRaises(NotImplementedError, baseqs.defer, 'shared_field')
-        self.assertRaises(NotImplementedError, baseqs.annotate)
-        self.assertRaises(NotImplementedError, baseqs.only)
-        self.assertRaises(NotImplementedError, baseqs.bulk_create, [])
         # select_related with no field is not implemented
         self.assertRaises(NotImplementedError, baseqs.select_related)
-        # select_related with language('all') is not implemented
-        self.assertRaises(NotImplementedError, len, baseqs.language('all').select_related('normal'))
-        if django.VERSION >= (1, 7):
-            self.assertRaises(NotImplementedError, baseqs.update_or_create)
 
 class MinimumVersionTests(HvadTestCase):
     def test_versions(self):
@@ -550,6 +1018,100 @@ class ExcludeTests(HvadTestCase, NormalFixture):
         self.assertEqual(qs[0].translated_field, NORMAL[1].translated_field['ja'])
 
 
+class LookupCacheTests(HvadTestCase, NormalFixture):
+    normal_count = 2
+
+    def setUp(self):
+        super(LookupCacheTests, self).setUp()
+        from hvad.manager import lookup_cache
+        self.cache = lookup_cache
+        self.cache.clear()
+
+    def test_cache_hits(self):
+        for index in (1, 2):
+            qs = Normal.objects.language('en').filter(shared_field=NORMAL[index].shared_field)
+            self.assertEqual([obj.translated_field for obj in qs],
+                             [NORMAL[index].translated_field['en']])
+        info = self.cache.info()
+        self.assertEqual(info.misses, 1)
+        self.assertEqual(info.hits, 1)
+        self.assertEqual(info.currsize, 1)
+
+        Normal.objects.language('en').exclude(shared_field=NORMAL[1].shared_field)
+        Normal.objects.language('en').filter(translated_field=NORMAL[1].translated_field['en'])
+        self.assertEqual(self.cache.info().misses, 2)
+
+        self.cache.clear()
+        self.assertEqual(self.cache.info(), (0, 0, self.cache.maxsize, 0))
+
+    def test_qobject_not_modified(self):
+        not_shared_two = ~Q(shared_field=NORMAL[2].shared_field)
+        translated_two = Q(translated_field=NORMAL[2].translated_field['ja'])
+        q = not_shared_two | translated_two
+
+        qs = Normal.objects.language('en').filter(q)
+        self.assertEqual([obj.pk for obj in qs], [self.normal_id[1]])
+        qs = Normal.objects.language('ja').filter(q).order_by('pk')
+        self.assertEqual([obj.pk for obj in qs], [self.normal_id[1], self.normal_id[2]])
+        self.assertEqual(self.cache.info().hits, 1)
+
+        self.assertEqual(list(q_keys(q)), ['shared_field', 'translated_field'])
+        self.assertIs(q.children[1], translated_two.children[0])
+
+
+class CountTests(HvadTestCase, NormalFixture):
+    normal_count = 2
+
+    @minimumDjangoVersion(1, 6)
+    def test_fallbacks_count(self):
+        from django.test.utils import CaptureQueriesContext
+        (Normal.objects.language('en')
+                       .filter(shared_field=NORMAL[1].shared_field)
+                       .delete_translations())
+        Normal.objects.untranslated().create(shared_field='untranslated')
+        qs = Normal.objects.language('en').fallbacks('ja').order_by('translated_field')
+        with CaptureQueriesContext(connection) as ctx:
+            self.assertEqual(qs.count(), 2)
+            self.assertTrue(qs.exists())
+            self.assertEqual(qs.filter(shared_field=NORMAL[2].shared_field).count(), 1)
+            self.assertFalse(qs.filter(shared_field='untranslated').exists())
+        self.assertEqual(len(ctx.captured_queries), 4)
+        for query in ctx.captured_queries:
+            self.assertNotIn('language_code', query['sql'])
+        self.assertEqual(len(qs), 2)
+
+    @minimumDjangoVersion(1, 6)
+    def test_fallbacks_count_translated_filter(self):
+        qs = (Normal.objects.language('en').fallbacks('ja')
+                            .filter(translated_field=NORMAL[1].translated_field['ja']))
+        self.assertEqual(qs.count(), 0)
+        self.assertFalse(qs.exists())
+        (Normal.objects.language('en')
+                       .filter(shared_field=NORMAL[1].shared_field)
+                       .delete_translations())
+        self.assertEqual(qs.count(), 1)
+        self.assertTrue(qs.exists())
+
+    def test_memoize_count(self):
+        qs = Normal.objects.language('en')
+        with self.assertNumQueries(2):
+            self.assertEqual(qs.count(), 2)
+            self.assertEqual(qs.count(), 2)
+
+        qs = Normal.objects.language('en').memoize_count()
+        with self.assertNumQueries(1):
+            self.assertEqual(qs.count(), 2)
+            self.assertEqual(qs.count(), 2)
+            self.assertTrue(qs.exists())
+
+        qs = qs.filter(shared_field=NORMAL[1].shared_field)
+        with self.assertNumQueries(1):
+            self.assertEqual(qs.count(), 1)
+            self.assertEqual(qs.count(), 1)
+        with self.assertNumQueries(1):
+            self.assertEqual(qs.memoize_count(False).count(), 1)
+
+
 class ComplexFilterTests(HvadTestCase, StandardFixture, NormalFixture):
     normal_count = 2
     standard_count = 2
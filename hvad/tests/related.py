@@ -8,7 +8,7 @@ from hvad.models import (TranslatedFields, TranslatableModel)
 from hvad.test_utils.context_managers import LanguageOverride
 from hvad.test_utils.data import NORMAL, STANDARD
 from hvad.test_utils.fixtures import NormalFixture, StandardFixture
-from hvad.test_utils.testcase import HvadTestCase
+from hvad.test_utils.testcase import HvadTestCase, minimumDjangoVersion
 from hvad.utils import get_translation_aware_manager
 from hvad.test_utils.project.app.models import (Normal, Related, SimpleRelated,
                                                 RelatedRelated, Standard, StandardRelated)
@@ -361,6 +361,106 @@ class SelectRelatedTests(HvadTestCase, NormalFixture):
                                       for obj in rel_objects),
                                  check)
 
+    def test_select_related_streaming(self):
+        with LanguageOverride('en'):
+            SimpleRelated.objects.language().create(normal=self.normal2, translated_field="test2")
+            master = Normal._meta.translations_model._meta.get_field('master')
+
+            with self.assertNumQueries(1):
+                iterator = (SimpleRelated.objects.language().select_related('normal')
+                                                            .order_by('normal__shared_field')
+                                                            .iterator())
+                obj = next(iterator)
+                # field must be reset while rows are still pending
+                self.assertFalse(master.unique)
+                self.assertEqual(obj.normal.translated_field, NORMAL[1].translated_field['en'])
+                obj = next(iterator)
+                self.assertEqual(obj.normal.translated_field, NORMAL[2].translated_field['en'])
+                self.assertRaises(StopIteration, next, iterator)
+
+    def test_select_related_plan_cache(self):
+        from hvad.manager import select_related_cache
+        select_related_cache.clear()
+        with LanguageOverride('en'):
+            for _ in range(2):
+                qs = SimpleRelated.objects.language().select_related('normal')
+                self.assertEqual([obj.normal.translated_field for obj in qs],
+                                 [NORMAL[1].translated_field['en']])
+            self.assertEqual(select_related_cache.info().misses, 1)
+            self.assertEqual(select_related_cache.info().hits, 1)
+
+            qs = SimpleRelated.objects.language().select_related('normal', 'translated_field')
+            self.assertRaises(ValueError, list, qs)
+            self.assertEqual(select_related_cache.info().currsize, 1)
+
+    def test_forced_unique_thread_local(self):
+        import threading
+        from hvad.manager import ForcedUniqueFields
+        master = Normal._meta.translations_model._meta.get_field('master')
+        seen = []
+        with ForcedUniqueFields((master,)):
+            self.assertTrue(master.unique)
+            thread = threading.Thread(target=lambda: seen.append(master.unique))
+            thread.start()
+            thread.join()
+            self.assertFalse(master._unique)
+        self.assertEqual(seen, [False])
+        self.assertFalse(master.unique)
+
+    @minimumDjangoVersion(1, 6)
+    def test_select_related_fallbacks(self):
+        with LanguageOverride('ja'):
+            SimpleRelated.objects.language().create(normal=self.normal2, translated_field="test2")
+        (Normal.objects.language('en').filter(pk=self.normal_id[2])
+                                      .delete_translations())
+        for strategy in ('selfjoin', 'window'):
+            with self.assertNumQueries(1):
+                rel_objects = list(SimpleRelated.objects.language('en')
+                                                        .fallbacks('ja')
+                                                        .fallback_strategy(strategy)
+                                                        .select_related('normal')
+                                                        .order_by('pk'))
+                self.assertEqual([(obj.language_code, obj.translated_field)
+                                  for obj in rel_objects],
+                                 [('en', 'test1'), ('ja', 'test2')])
+                self.assertEqual([(obj.normal.language_code, obj.normal.translated_field)
+                                  for obj in rel_objects],
+                                 [('en', NORMAL[1].translated_field['en']),
+                                  ('ja', NORMAL[2].translated_field['ja'])])
+
+            # related translations are only ranked for matching rows
+            with self.assertNumQueries(1):
+                rel_objects = list(SimpleRelated.objects.language('en')
+                                                        .fallbacks('ja')
+                                                        .fallback_strategy(strategy)
+                                                        .select_related('normal')
+                                                        .filter(normal=self.normal2)
+                                                        .order_by('-pk')[:1])
+                self.assertEqual([(obj.normal.language_code, obj.normal.translated_field)
+                                  for obj in rel_objects],
+                                 [('ja', NORMAL[2].translated_field['ja'])])
+
+    def test_select_related_all_languages(self):
+        with LanguageOverride('ja'):
+            SimpleRelated.objects.language().create(normal=self.normal2, translated_field="test2")
+        simple = SimpleRelated.objects.language('en').get(normal=self.normal1)
+        simple.translate('ja')
+        simple.translated_field = 'test1-ja'
+        simple.save()
+
+        with self.assertNumQueries(1):
+            rel_objects = list(SimpleRelated.objects.language('all')
+                                                    .select_related('normal')
+                                                    .order_by('pk', 'language_code'))
+            self.assertEqual([(obj.language_code, obj.translated_field)
+                              for obj in rel_objects],
+                             [('en', 'test1'), ('ja', 'test1-ja'), ('ja', 'test2')])
+            self.assertEqual([(obj.normal.language_code, obj.normal.translated_field)
+                              for obj in rel_objects],
+                             [('en', NORMAL[1].translated_field['en']),
+                              ('ja', NORMAL[1].translated_field['ja']),
+                              ('ja', NORMAL[2].translated_field['ja'])])
+
     def test_select_related_cleans_cache(self):
         with LanguageOverride('en'):
             rel_objects = SimpleRelated.objects.language().select_related('normal')
@@ -1,5 +1,8 @@
+from collections import defaultdict
 import django
+from django.conf import settings
 from django.db.models.fields import FieldDoesNotExist
+from django.db.models.query_utils import DeferredAttribute, deferred_class_factory
 from django.utils.translation import get_language
 from hvad.exceptions import WrongManager
 
@@ -13,20 +16,142 @@ def combine(trans, klass):
     """
     combined = trans.master
     if klass._meta.proxy:
-        combined.__class__ = klass
+        combined.__class__ = get_proxy_class(klass, combined.__class__)
     opts = combined._meta
     setattr(combined, opts.translations_cache, trans)
     return combined
 
+def get_proxy_class(klass, cls):
+    """
+    Returns the class instances of cls must be casted to, to become instances
+    of proxy model klass. If cls is a deferred class, that is a deferred class
+    of klass, so that deferred fields can still be loaded.
+    """
+    if not getattr(cls, '_deferred', False):
+        return klass
+    deferred = [name for name, value in cls.__dict__.items()
+                if isinstance(value, DeferredAttribute)]
+    return deferred_class_factory(klass, deferred)
+
 def get_cached_translation(instance):
     return getattr(instance, instance._meta.translations_cache, None)
 
+def set_cached_translation(instance, translation):
+    """
+    Make 'translation' the active translation of the instance, keeping the
+    translation it replaces in the instance's loaded translations, so that
+    switching back to it does not need a query.
+    """
+    opts = instance._meta
+    loaded = getattr(instance, opts.translations_loaded, None)
+    if loaded is None:
+        loaded = {}
+        setattr(instance, opts.translations_loaded, loaded)
+    previous = getattr(instance, opts.translations_cache, None)
+    if previous is not None:
+        loaded[previous.language_code] = previous
+    loaded[translation.language_code] = translation
+    setattr(instance, opts.translations_cache, translation)
+
 def get_translation(instance, language_code=None):
     opts = instance._meta
     if not language_code:
         language_code = get_language()
-    accessor = getattr(instance, opts.translations_accessor)
-    return accessor.get(language_code=language_code)
+    batch = getattr(instance, opts.translations_batch, None)
+    if batch is not None:
+        # load the language for all instances fetched along this one
+        batch.load(language_code)
+    try:
+        translation = getattr(instance, opts.translations_loaded)[language_code]
+    except (AttributeError, KeyError):
+        accessor = getattr(instance, opts.translations_accessor)
+        return accessor.get(language_code=language_code)
+    if translation is None:
+        # language was prefetched, but instance has no translation in it
+        raise opts.translations_model.DoesNotExist('%s matching query does not exist.' %
+                                                   opts.translations_model._meta.object_name)
+    return translation
+
+def prefetch_translations(instances, languages=None, using=None):
+    """
+    Load the translations of a list of instances, all from the same model, in
+    a single query, and store them on the instances so that get_translation()
+    and translated fields do not hit the database anymore.
+
+    If 'languages' is None, all translations are loaded.
+    """
+    by_pk = defaultdict(list)
+    for instance in instances:
+        if instance.pk is not None:
+            by_pk[instance.pk].append(instance)
+    if not by_pk:
+        return
+    opts = instances[0]._meta
+    tmodel = opts.translations_model
+    master_cache = tmodel._meta.get_field('master').get_cache_name()
+
+    qs = tmodel.objects.using(using).filter(master__in=list(by_pk))
+    if languages is not None:
+        qs = qs.filter(language_code__in=languages)
+    translations = defaultdict(list)
+    for translation in qs:
+        translations[translation.master_id].append(translation)
+
+    # Languages that were looked for and not found are stored as None
+    missing = languages or [code for code, name in settings.LANGUAGES]
+    prefetch_name = getattr(instances[0].__class__,
+                            opts.translations_accessor).related.field.related_query_name()
+    for pk, group in by_pk.items():
+        for instance in group:
+            loaded = getattr(instance, opts.translations_loaded, None)
+            if loaded is None:
+                loaded = {}
+                setattr(instance, opts.translations_loaded, loaded)
+            for code in missing:
+                loaded.setdefault(code, None)
+            for translation in translations[pk]:
+                # translations already loaded on the instance might have changes
+                if loaded.get(translation.language_code) is None:
+                    loaded[translation.language_code] = translation
+                setattr(translation, master_cache, group[0])
+            active = get_cached_translation(instance)
+            if active is not None:
+                loaded[active.language_code] = active
+
+            if languages is None:
+                # we know all translations, also feed django's prefetch cache
+                qs = getattr(instance, opts.translations_accessor).all()
+                qs._result_cache = [loaded[trans.language_code] for trans in translations[pk]]
+                qs._prefetch_done = True
+                if not hasattr(instance, '_prefetched_objects_cache'):
+                    instance._prefetched_objects_cache = {}
+                instance._prefetched_objects_cache[prefetch_name] = qs
+
+class TranslationsBatch(object):
+    """
+    A list of instances of the same model, loaded together. The first time a
+    language is needed on one of them, it is loaded for all of them.
+    """
+    def __init__(self, instances, using=None):
+        self.instances = instances
+        self.using = using
+        self.languages = set()
+
+    def load(self, language_code):
+        if language_code in self.languages:
+            return
+        self.languages.add(language_code)
+        instances = []
+        for instance in self.instances:
+            loaded = getattr(instance, instance._meta.translations_loaded, None)
+            if loaded is None or language_code not in loaded:
+                instances.append(instance)
+        if instances:
+            prefetch_translations(instances, (language_code,), self.using)
+
+    def __reduce__(self):
+        # Siblings must not be pickled along with an instance
+        return (TranslationsBatch, ((),))
 
 def get_translation_aware_manager(model):
     from hvad.manager import TranslationAwareManager